@@ -0,0 +1,64 @@
+# Measure the time taken to import empyro modules, using the interpreter's
+# `-X importtime` option, and check it against a budget.
+# usage: python3 benchmarks/import_time.py [-n=runs] [module ...]
+#   -- option -n sets the number of runs per module, the fastest is kept.
+# the modules default to those in `BUDGETS`. exits with 1 if any module is
+# over its budget.
+
+import subprocess
+import sys
+from pathlib import Path
+
+# module -> import time budget in milliseconds, including its imports
+# from the standard library (typing alone takes a few milliseconds).
+BUDGETS = {
+    'empyro': 5,
+    'empyro.color': 25,
+    'empyro.coord': 25,
+    'empyro.key': 30,
+    'empyro.glyph': 40,
+    'empyro.terminal': 50,
+    'empyro.backends.memory': 60,
+}
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def import_time(module: str) -> float:
+    """Return the cumulative import time of a module in milliseconds,
+    imported in a fresh interpreter.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        cwd=str(ROOT), stderr=subprocess.PIPE, universal_newlines=True,
+        check=True)
+    # lines are: import time: self [us] | cumulative | imported package
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if name.strip() == module:
+            return int(cumulative) / 1000
+    raise ValueError('module not imported: {}'.format(module))
+
+
+if __name__ == '__main__':
+    runs, modules = 5, []
+    for arg in sys.argv[1:]:
+        if arg.startswith('-n='):
+            runs = int(arg[3:])
+        else:
+            modules.append(arg)
+    modules = modules or list(BUDGETS)
+
+    over = False
+    for module in modules:
+        elapsed = min(import_time(module) for _ in range(runs))
+        budget = BUDGETS.get(module)
+        status = ''
+        if budget is not None:
+            status = 'ok' if elapsed <= budget else 'OVER BUDGET'
+            over = over or elapsed > budget
+            status = '(budget {} ms) {}'.format(budget, status)
+        print('{:<24} {:8.2f} ms {}'.format(module, elapsed, status))
+    sys.exit(1 if over else 0)
@@ -0,0 +1,131 @@
+# Measure the memory used per cell by the terminals of empyro at several
+# sizes, using tracemalloc, and compare the compact representations of the
+# cells with the ones they replaced.
+# usage: python3 benchmarks/memory.py [WIDTHxHEIGHT ...]
+#   -- the sizes default to those in `SIZES`.
+#
+# reported, in bytes per cell:
+#   cells   -- the committed cells of a `DrawMixin` terminal, every cell
+#              drawn with its own glyph.
+#   dirty   -- the changed cells pending until the next render.
+#   packed  -- the cells packed into an array('Q'), as in the snapshots of
+#              cached views and in frame buffers.
+#   caches  -- the render caches, a full size cached view and the cache of
+#              `glyph.pack` after packing every cell.
+#   legacy  -- the committed cells as glyphs and colors were before they
+#              were slotted, with a color object copied per glyph.
+
+import sys
+import tracemalloc
+from array import array
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from empyro import color, glyph  # noqa: E402
+from empyro.backends.memory import MemoryTerminal  # noqa: E402
+from empyro.coord import Point, Rect  # noqa: E402
+
+SIZES = [(80, 24), (200, 60), (400, 200)]
+
+COLORS = [color.BLACK, color.RED, color.GREEN, color.YELLOW, color.BLUE,
+          color.MAGENTA, color.CYAN, color.WHITE]
+
+
+class LegacyColor(color._Color):
+    # a color with an instance dictionary, as before `Color.__slots__`.
+    pass
+
+
+class LegacyGlyph(glyph._Glyph):
+    # a glyph with an instance dictionary, copying its colors, as before
+    # `Glyph.__slots__`.
+    def __new__(cls, code, fg_color, bg_color):
+        return super().__new__(cls, code, LegacyColor(*fg_color),
+                               LegacyColor(*bg_color))
+
+
+def rows(width: int, height: int, make=glyph.Glyph):
+    """Yield the rows of glyphs filling a terminal, a new glyph per cell."""
+    for y in range(height):
+        yield [make(33 + (x + y) % 94, COLORS[x % len(COLORS)],
+                    COLORS[y % len(COLORS)]) for x in range(width)]
+
+
+def measure(function) -> int:
+    """Return the bytes allocated by `function` and kept alive by what it
+    returns.
+    """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = function()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del result
+    return after - before
+
+
+def committed(width: int, height: int, make=glyph.Glyph):
+    def run():
+        term = MemoryTerminal((width, height))
+        for y, row in enumerate(rows(width, height, make)):
+            term.draw_span(row, Point(0, y))
+        term.render()
+        return term
+    # the cells of a clear terminal all share `glyph.CLEAR`
+    return measure(run) - measure(lambda: MemoryTerminal((width, height)))
+
+
+def dirty(width: int, height: int):
+    term = MemoryTerminal((width, height))
+    glyphs = list(rows(width, height))
+
+    def run():
+        for y, row in enumerate(glyphs):
+            term.draw_span(row, Point(0, y))
+        return term
+    return measure(run)
+
+
+def packed(width: int, height: int):
+    glyphs = [g for row in rows(width, height) for g in row]
+    # the growth of the cache of `glyph.pack` is counted in `caches`
+    for value in glyphs:
+        glyph.pack(value)
+    return measure(lambda: array('Q', map(glyph.pack, glyphs)))
+
+
+def caches(width: int, height: int):
+    term = MemoryTerminal((width, height))
+    glyphs = [g for row in rows(width, height) for g in row]
+    glyph.pack.cache_clear()
+
+    def run():
+        view = term.view(Rect(0, 0, width, height), cached=True)
+        for value in glyphs:
+            glyph.pack(value)
+        return view
+    return measure(run)
+
+
+def report(width: int, height: int):
+    cells = width * height
+    results = [
+        ('cells', committed(width, height)),
+        ('dirty', dirty(width, height)),
+        ('packed', packed(width, height)),
+        ('caches', caches(width, height)),
+        ('legacy', committed(width, height, LegacyGlyph)),
+    ]
+    print('{}x{} ({} cells)'.format(width, height, cells))
+    for name, size in results:
+        print('  {:<8} {:8.1f} bytes/cell {:10.1f} KiB'.format(
+            name, size / cells, size / 1024))
+
+
+if __name__ == '__main__':
+    sizes = [tuple(int(n) for n in arg.split('x')) for arg in sys.argv[1:]]
+    for width, height in sizes or SIZES:
+        report(width, height)
@@ -1,9 +1,42 @@
+"""Empyro, a terminal emulator for roguelikes.
+
+The submodules are imported when first accessed as attributes of the
+package, so `import empyro` loads nothing else and importing a single
+module, such as `empyro.color`, doesn't import the rest.
+"""
+
 __all__ = [
+    'animation',
+    'box',
+    'canvas',
     'charcode',
     'color',
     'coord',
+    'displaylist',
+    'event',
     'font',
+    'framebuffer',
     'glyph',
+    'image',
+    'keymap',
+    'layout',
+    'markup',
+    'replay',
+    'session',
+    'stats',
     'terminal',
-    'terminals',
+    'threadsafe',
 ]
+
+
+def __getattr__(name):
+    if name in __all__ or name == 'backends':
+        # importlib itself is only imported when needed
+        from importlib import import_module
+        return import_module('.' + name, __name__)
+    raise AttributeError(
+        'module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
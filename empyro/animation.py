@@ -0,0 +1,223 @@
+"""Timed animations of the cells of a terminal, such as blinking cursors,
+color pulses and fades.
+
+An animation computes a single value per tick, a color or a character,
+shared by all of its cells, and redraws its cells only when the value
+changes. The cells keep what was drawn to them, only the animated part of
+the glyphs changes, so animations need terminals that can read back their
+cells (see `Terminal.glyph_at`).
+
+Finished animations are removed by the animator, and ticking an animator
+with no animations, or whose values didn't change, draws nothing.
+
+defines the following:
+    Animation  -- base class for animations.
+    ColorTween -- blend the colors of cells from a color to another.
+    GlyphCycle -- cycle the characters of cells.
+    Animator   -- ticks the animations of a terminal.
+"""
+
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Sequence, Text, Union
+
+from .color import Color
+from .coord import Point, Rect
+from .glyph import Glyph
+
+FG = 'fg'
+BG = 'bg'
+
+
+def _window(window: Union[Rect, Point]) -> Rect:
+    if len(window) == 2:
+        return Rect(window[0], window[1], 1, 1)
+    return Rect(*window)
+
+
+class Animation(ABC):
+    """Base class for animations of a window of cells.
+
+    properties:
+        window   -- the animated cells, a rect or a single point.
+        duration -- the duration of a cycle of the animation in seconds.
+        repeat   -- the number of cycles, None to repeat until removed.
+        easing   -- maps the progress of a cycle, from 0 to 1, to the
+                    progress of the animation. linear if None.
+        finished -- true once all the cycles are done.
+
+    Subclasses implement `value` and `apply`.
+    """
+
+    def __init__(self, window: Union[Rect, Point], duration: float,
+                 repeat: int = 1, easing: Callable[[float], float] = None):
+        if duration <= 0:
+            raise ValueError('duration must be positive')
+        self.window = _window(window)
+        self.duration = duration
+        self.repeat = repeat
+        self.easing = easing
+        self.finished = False
+        self._start = None
+        # the last value applied, the cells are redrawn when it changes.
+        self._last = None
+
+    @abstractmethod
+    def value(self, progress: float):
+        """Return the value of the animation at `progress`, from 0 to 1."""
+        pass
+
+    @abstractmethod
+    def apply(self, terminal, value):
+        """Draw the value to the animated cells of the terminal."""
+        pass
+
+    def tick(self, terminal, now: float):
+        """Advance the animation to the time `now`, in seconds."""
+        if self._start is None:
+            self._start = now
+        cycles = (now - self._start) / self.duration
+        if self.repeat is not None and cycles >= self.repeat:
+            self.finished = True
+            progress = 1.0
+        else:
+            progress = cycles % 1.0
+        if self.easing is not None:
+            progress = self.easing(progress)
+        value = self.value(progress)
+        if value != self._last:
+            self._last = value
+            self.apply(terminal, value)
+
+
+class ColorTween(Animation):
+    """Blend the foreground or background color of cells from `start` to
+    `end`, see `Color.blend`. With `bounce`, every cycle blends back to
+    `start`, making a pulse.
+
+    >>> from empyro.backends.memory import MemoryTerminal
+    >>> from empyro import color
+    >>> term = MemoryTerminal((4, 1)).write('hp', (0, 0))
+    >>> fade = ColorTween((0, 0, 2, 1), color.BLACK, color.WHITE, 2.0)
+    >>> animator = Animator(term).add(fade)
+    >>> _ = animator.tick(0.0).tick(1.0)
+    >>> term.glyph_at((1, 0)).fg_color, term.glyph_at((1, 0)).code
+    (Color(r=96, g=96, b=96), <CharCode.P_LOWER: 112>)
+    >>> len(animator.tick(5.0))
+    0
+    """
+
+    def __init__(self, window: Union[Rect, Point], start: Color, end: Color,
+                 duration: float, layer: Text = FG, repeat: int = 1,
+                 bounce: bool = False,
+                 easing: Callable[[float], float] = None):
+        super().__init__(window, duration, repeat, easing)
+        if layer not in (FG, BG):
+            raise ValueError('unknown layer: {!r}'.format(layer))
+        self.start = Color(*start)
+        self.end = Color(*end)
+        self.layer = layer
+        self.bounce = bounce
+
+    def value(self, progress: float) -> Color:
+        if self.bounce:
+            progress = 1.0 - abs(2.0 * progress - 1.0)
+        return self.start.blend(self.end, progress)
+
+    def apply(self, terminal, value: Color):
+        x, y, width, height = self.window
+        glyph_at = terminal.glyph_at
+        for row in range(y, y + height):
+            cells = [glyph_at(Point(column, row))
+                     for column in range(x, x + width)]
+            if self.layer == FG:
+                glyphs = [Glyph(cell.code, value, cell.bg_color)
+                          for cell in cells]
+            else:
+                glyphs = [Glyph(cell.code, cell.fg_color, value)
+                          for cell in cells]
+            terminal.draw_span(glyphs, Point(x, row))
+
+
+class GlyphCycle(Animation):
+    """Cycle the character of cells through `chars`, each shown for an
+    equal part of the duration, such as a blinking cursor. The colors of
+    the cells are kept.
+
+    >>> from empyro.backends.memory import MemoryTerminal
+    >>> term = MemoryTerminal((4, 1))
+    >>> cursor = GlyphCycle((3, 0), '_ ', 1.0, repeat=None)
+    >>> animator = Animator(term).add(cursor)
+    >>> [len(animator.tick(now).terminal.render()) for now in (0, .2, .6)]
+    [1, 0, 1]
+    """
+
+    def __init__(self, window: Union[Rect, Point], chars: Sequence,
+                 duration: float, repeat: int = 1,
+                 easing: Callable[[float], float] = None):
+        super().__init__(window, duration, repeat, easing)
+        if not chars:
+            raise ValueError('no characters to cycle')
+        self.chars = list(chars)
+
+    def value(self, progress: float):
+        return self.chars[min(int(progress * len(self.chars)),
+                              len(self.chars) - 1)]
+
+    def apply(self, terminal, value):
+        x, y, width, height = self.window
+        glyph_at = terminal.glyph_at
+        for row in range(y, y + height):
+            glyphs = []
+            for column in range(x, x + width):
+                cell = glyph_at(Point(column, row))
+                glyphs.append(Glyph(value, cell.fg_color, cell.bg_color))
+            terminal.draw_span(glyphs, Point(x, row))
+
+
+class Animator:
+    """Ticks the animations of a terminal, drawing their changes before
+    the terminal is rendered. See `RenderableTerminal.animator`.
+
+    properties:
+        terminal -- the animated terminal.
+        clock    -- returns the current time in seconds, used when `tick`
+                    is called without a time.
+    """
+
+    def __init__(self, terminal, clock: Callable[[], float] = None):
+        self.terminal = terminal
+        self.clock = time.perf_counter if clock is None else clock
+        self._animations = []
+
+    def add(self, animation: Animation):
+        """Start an animation on the next tick."""
+        self._animations.append(animation)
+        return self
+
+    def remove(self, animation: Animation):
+        """Stop an animation, the cells keep their current glyphs."""
+        self._animations.remove(animation)
+        return self
+
+    def clear(self):
+        """Stop all the animations."""
+        self._animations.clear()
+        return self
+
+    def tick(self, now: float = None):
+        """Advance the animations to the time `now` and draw their changes,
+        removing the finished ones.
+        """
+        if not self._animations:
+            return self
+        now = self.clock() if now is None else now
+        terminal = self.terminal
+        for animation in self._animations:
+            animation.tick(terminal, now)
+        self._animations = [animation for animation in self._animations
+                            if not animation.finished]
+        return self
+
+    def __len__(self) -> int:
+        return len(self._animations)
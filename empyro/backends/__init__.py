@@ -1,4 +1,5 @@
 __all__ = [
+    'memory',
     # for dev purposes. currently this is disabled by default as
     # it requires the pygame dependency.
     # 'surface',
@@ -0,0 +1,53 @@
+"""A headless, in-memory terminal backend.
+
+The terminal renders to a list of the changed cells, meant to be sent to a
+remote client or inspected in tests. It loads no fonts and needs no display,
+and all instances share the same immutable glyphs, see `glyph.CLEAR`.
+
+defines the following:
+    MemoryTerminal -- a renderable terminal kept in memory.
+"""
+
+from collections import deque
+from typing import List, Tuple
+
+from empyro.coord import Point, Size
+from empyro.event import Event, KeyPress, coalesce
+from empyro.glyph import Glyph
+from empyro.key import Key
+from empyro.terminal import RenderableTerminal
+from empyro.mixin import DrawMixin
+
+
+class MemoryTerminal(DrawMixin, RenderableTerminal):
+    """A renderable terminal kept in memory.
+
+    `render` returns the list of the cells changed since the last render.
+    Input is fed with `feed_key`, `get_key` returns None if no key is
+    pending, and `read_events` returns the pending keys as a batch.
+
+    >>> term = MemoryTerminal((10, 2))
+    >>> [at for at, _ in term.write('hi', (0, 1)).render()]
+    [Point(x=0, y=1), Point(x=1, y=1)]
+    >>> term.render()
+    []
+    """
+
+    def __init__(self, size: Size = None):
+        super().__init__(size)
+        self._keys = deque()
+
+    def render(self) -> List[Tuple[Point, Glyph]]:
+        return list(self.consume_changed_cells())
+
+    def feed_key(self, key: Key):
+        """Queue a key to be returned by `get_key`."""
+        self._keys.append(key)
+        return self
+
+    def get_key(self) -> Key:
+        return self._keys.popleft() if self._keys else None
+
+    def read_events(self) -> List[Event]:
+        keys, self._keys = self._keys, deque()
+        return coalesce(KeyPress(key) for key in keys)
@@ -1,13 +1,25 @@
+from collections import OrderedDict
+from typing import List, Union
+import weakref
+
 import pygame
 
-from empyro.coord import Size
+from empyro.coord import Point, Size
 from empyro import color
+from empyro.charcode import code_points
+from empyro.event import (Event, KeyPress, MouseClick, MouseMotion,
+                          coalesce)
 from empyro.glyph import Glyph
 from empyro.key import Key, KeyCode, KeyMod
 from empyro.terminal import RenderableTerminal
 from empyro.mixin import DrawMixin
 from empyro import font as font_
-from empyro.font import Font
+from empyro.font import Font, TTFont
+from empyro.backends.surface.atlas import (load_glyphs, glyph_masks,
+                                           scaled_size)
+
+# the maximum number of tinted glyph surfaces kept by a terminal.
+_TINTED_CACHE_SIZE = 4096
 
 
 class SurfaceTerminal(DrawMixin, RenderableTerminal):
@@ -16,65 +28,271 @@ class SurfaceTerminal(DrawMixin, RenderableTerminal):
     properties
         size -- the size (width and height) of the terminal in characters.
         font -- the font used to render the glyphs. fonts are images,
-                loaded using `font.load_fonts` function.
-        char_width -- the character width. taken from the font.
-        line_height -- the line height of a character. taken from the font.
+                loaded using `font.load_fonts` function, or true type
+                fonts (`font.TTFont`) for characters outside code page 437.
+        char_width -- the character width. taken from the font, scaled.
+        line_height -- the line height of a character. taken from the font,
+                       scaled.
+        scale -- the scale of the glyphs, integer or fractional, see
+                 `set_scale`.
         display -- the underlying pygame surface (also the pygame display)
                 used to render the terminal.
+
+    If `resizable` is true, the window can be resized by the user, resizing
+    the terminal to the number of cells fitting in the window.
+
+    If `mouse` is true, the mouse cursor is shown and `read_events` reports
+    mouse clicks and motion.
     """
 
-    def __init__(self, size: Size = None, font: Font = None):
+    _scroll_by_blit = True
+
+    def __init__(self, size: Size = None, font: Union[Font, TTFont] = None,
+                 resizable: bool = False, mouse: bool = False,
+                 scale: float = 1):
         super().__init__(size)
         pygame.display.init()
-        pygame.mouse.set_visible(False)
+        pygame.mouse.set_visible(mouse)
         self.font = font_.CP437_9x16 if font is None else font
-        self.char_width = self.font.size.width
-        self.line_height = self.font.size.height
-        size = (self.size.width * self.font.size.width,
-                self.size.height * self.font.size.height)
+        self.scale = scale
+        self.char_width, self.line_height = scaled_size(self.font.size, scale)
+        self._display_flags = pygame.RESIZABLE if resizable else 0
         try:
-            self.display = pygame.display.set_mode(size)
-            self._font_surface, self._glyph_surfaces = _load_glyphs(self.font)
+            self.display = pygame.display.set_mode(
+                self._display_size(), self._display_flags)
+            # scale -> glyph source, loaded for the display of the terminal.
+            self._glyph_sources = {}
+            self._glyphs = self._load_glyphs(scale)
+            # (code point, fg color) -> glyph surface tinted with the color,
+            # least recently used first.
+            self._tinted = OrderedDict()
+            # cached view -> (view version, rastered view surface).
+            self._view_surfaces = weakref.WeakKeyDictionary()
+            # cached views to blit on the next render.
+            self._composited = []
+            # the cell the mouse was last reported over.
+            self._mouse_at = None
             pygame.event.set_allowed(None)
-            pygame.event.set_allowed([pygame.KEYDOWN])
+            pygame.event.set_allowed([pygame.KEYDOWN, pygame.VIDEORESIZE])
+            if mouse:
+                pygame.event.set_allowed([pygame.MOUSEBUTTONDOWN,
+                                          pygame.MOUSEMOTION])
             pygame.key.set_repeat(500, 200)
         except:
             pygame.display.quit()
             raise
 
+    def _load_glyphs(self, scale: float):
+        try:
+            return self._glyph_sources[scale]
+        except KeyError:
+            glyphs = self._glyph_sources[scale] = load_glyphs(self.font, scale)
+            return glyphs
+
+    def glyph_matcher(self, codes=None):
+        """Return an `image.GlyphMatcher` of the glyphs of the font, for
+        drawing images. `codes` defaults to code page 437. Requires numpy.
+        """
+        from empyro.image import GlyphMatcher
+        codes = list(code_points) if codes is None else list(codes)
+        return GlyphMatcher(codes, glyph_masks(
+            self._glyphs, codes, (self.char_width, self.line_height)))
+
+    def _display_size(self):
+        return (self.size.width * self.char_width,
+                self.size.height * self.line_height)
+
+    def resize(self, size: Size):
+        """Resize the terminal and its display. The loaded glyphs are kept,
+        and only the newly exposed cells are drawn on the next render.
+        """
+        # the display has to match the cells before copying it
+        for scroll in self.consume_scrolls():
+            self._scroll_display(*scroll)
+        old_display = self.display.copy()
+        super().resize(size)
+        self.display = pygame.display.set_mode(
+            self._display_size(), self._display_flags)
+        self.display.blit(old_display, (0, 0))
+        pygame.display.flip()
+        return self
+
+    def set_scale(self, scale: float):
+        """Change the scale of the glyphs, resizing the window to fit the
+        cells. The glyphs are scaled once, or reused if the terminal used
+        the scale before, and all the cells are drawn on the next
+        render.
+        """
+        if scale == self.scale:
+            return self
+        self.scale = scale
+        self.char_width, self.line_height = scaled_size(self.font.size, scale)
+        self._glyphs = self._load_glyphs(scale)
+        self._tinted.clear()
+        self._view_surfaces.clear()
+        # the whole display is drawn again, with the moves already applied
+        self._scrolls.clear()
+        self.display = pygame.display.set_mode(
+            self._display_size(), self._display_flags)
+        self._stale_cells.update(
+            Point(x, y)
+            for x in range(self.size.width) for y in range(self.size.height))
+        for view in list(self._cached_views):
+            view.invalidate()
+        return self
+
     def _get_render_surfaces(self):
-        draw_surf = pygame.Surface(self.font.size)
-        draw_surf.set_colorkey(color.BLACK)
         for at, glyph in self.consume_changed_cells():
-            glyph_surf = self._glyph_surfaces[glyph.code.altcode]
-            draw_surf.blit(glyph_surf, (0, 0))
-            draw_surf.fill(glyph.fg_color, None, pygame.BLEND_MULT)
             draw_rect = (at[0] * self.char_width,
                          at[1] * self.line_height,
                          self.char_width, self.line_height)
             self.display.fill(glyph.bg_color, draw_rect)
-            yield draw_surf, draw_rect
-            draw_surf.fill(color.BLACK)
+            yield self._tinted_glyph(glyph.code, glyph.fg_color), draw_rect
+
+    def _tinted_glyph(self, code, fg_color):
+        # glyphs are tinted once per color, this way recoloring cells
+        # through a palette reuses the surfaces of the previous frames.
+        key = (code, fg_color)
+        try:
+            surf = self._tinted[key]
+        except KeyError:
+            pass
+        else:
+            self._tinted.move_to_end(key)
+            # the glyph is still in use, even if it isn't read again
+            self._glyphs.touch(code)
+            return surf
+        if len(self._tinted) >= _TINTED_CACHE_SIZE:
+            self._tinted.popitem(last=False)
+        surf = pygame.Surface((self.char_width, self.line_height))
+        surf.set_colorkey(color.BLACK)
+        surf.blit(self._glyphs.get(code), (0, 0))
+        surf.fill(fg_color, None, pygame.BLEND_MULT)
+        self._tinted[key] = surf
+        return surf
+
+    def _scroll_display(self, window, dx, dy):
+        # move the rendered cells with a single self blit of the display.
+        rect = pygame.Rect(window.x * self.char_width,
+                           window.y * self.line_height,
+                           window.width * self.char_width,
+                           window.height * self.line_height)
+        self.display.set_clip(rect)
+        self.display.scroll(dx * self.char_width, dy * self.line_height)
+        self.display.set_clip(None)
+        return rect
+
+    def _composite_view(self, view):
+        # the view surface replaces the cells beneath it
+        for at, glyph in view.cells():
+            self._changed_cells.pop(at, None)
+            self._stale_cells.discard(at)
+            self._commit(at, glyph)
+        self._composited.append(view)
+
+    def _detach_cached_view(self, view):
+        super()._detach_cached_view(view)
+        self._view_surfaces.pop(view, None)
+        if view in self._composited:
+            self._composited.remove(view)
+
+    def _view_surface(self, view):
+        # raster the view once per version of its contents.
+        version, surface = self._view_surfaces.get(view, (None, None))
+        if version == view.version:
+            return surface
+        x0, y0 = view.view_window.x, view.view_window.y
+        surface = pygame.Surface((view.size.width * self.char_width,
+                                  view.size.height * self.line_height))
+        for at, glyph in view.cells():
+            if self.palette is not None:
+                glyph = self._resolve(glyph)
+            draw_rect = ((at[0] - x0) * self.char_width,
+                         (at[1] - y0) * self.line_height,
+                         self.char_width, self.line_height)
+            surface.fill(glyph.bg_color, draw_rect)
+            surface.blit(
+                self._tinted_glyph(glyph.code, glyph.fg_color),
+                draw_rect)
+        self._view_surfaces[view] = view.version, surface
+        return surface
+
+    def _blit_view(self, view):
+        return self.display.blit(
+            self._view_surface(view),
+            (view.view_window.x * self.char_width,
+             view.view_window.y * self.line_height))
 
     def render(self):
-        rects = self.display.blits(self._get_render_surfaces())
+        """Render the changes to the display, return the updated rects."""
+        self._glyphs.next_frame()
+        rects = [self._scroll_display(*s) for s in self.consume_scrolls()]
+        rects += self.display.blits(self._get_render_surfaces())
+        rects += [self._blit_view(view) for view in self._composited]
+        self._composited.clear()
         pygame.display.update(rects)
+        return rects
+
+    def _handle_resize(self, event):
+        self.resize((max(1, event.w // self.char_width),
+                     max(1, event.h // self.line_height)))
+        self.render()
 
     def get_key(self):
         pygame.event.clear()
         while True:
-            c = map_key_code(pygame.event.wait())
-            if c is not None:
-                # get the mods state
-                m = KeyMod.NO_MOD
-                mods = pygame.key.get_mods()
-                if mods & pygame.KMOD_CTRL:
-                    m |= KeyMod.CTRL
-                if mods & pygame.KMOD_SHIFT:
-                    m |= KeyMod.SHIFT
-                if mods & pygame.KMOD_ALT:
-                    m |= KeyMod.ALT
-                return Key(c, m)
+            event = pygame.event.wait()
+            if event.type == pygame.VIDEORESIZE:
+                self._handle_resize(event)
+                continue
+            if event.type == pygame.KEYDOWN:
+                key = map_key(event)
+                if key is not None:
+                    return key
+
+    def _cell_at(self, pos) -> Point:
+        # the cell under a display position, clamped to the terminal.
+        return Point(
+            min(max(0, pos[0] // self.char_width), self.size.width - 1),
+            min(max(0, pos[1] // self.line_height), self.size.height - 1))
+
+    def read_events(self) -> List[Event]:
+        """Return the events pending since the last read, without waiting,
+        see `Terminal.read_events`. Motion within the cell the mouse was
+        last reported over is not reported.
+        """
+        events = []
+        for event in pygame.event.get():
+            if event.type == pygame.KEYDOWN:
+                key = map_key(event)
+                if key is not None:
+                    events.append(KeyPress(key))
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                events.append(MouseClick(self._cell_at(event.pos),
+                                         event.button))
+            elif event.type == pygame.MOUSEMOTION:
+                at = self._cell_at(event.pos)
+                if at != self._mouse_at:
+                    self._mouse_at = at
+                    events.append(MouseMotion(at))
+            elif event.type == pygame.VIDEORESIZE:
+                self._handle_resize(event)
+        return coalesce(events)
+
+
+def map_key(event):
+    c = map_key_code(event)
+    if c is None:
+        return None
+    # the mods state when the key was pressed
+    m = KeyMod.NO_MOD
+    if event.mod & pygame.KMOD_CTRL:
+        m |= KeyMod.CTRL
+    if event.mod & pygame.KMOD_SHIFT:
+        m |= KeyMod.SHIFT
+    if event.mod & pygame.KMOD_ALT:
+        m |= KeyMod.ALT
+    return Key(c, m)
 
 
 def map_key_code(event):
@@ -82,14 +300,3 @@ def map_key_code(event):
         return KeyCode(event.key)
     except:
         return None
-
-def _load_glyphs(font: Font):
-    char_width, line_height = font.size
-    font_surface = pygame.image.load(font.path).convert()
-    font_surface.set_colorkey(color.BLACK)
-    glyph_surfaces = [
-        font_surface.subsurface(
-            (x * char_width, y * line_height, char_width, line_height))
-        for y in range(16) for x in range(16)
-    ]
-    return font_surface, glyph_surfaces
@@ -0,0 +1,183 @@
+"""Glyph surfaces for the surface backend.
+
+defines the following:
+    BitmapGlyphs -- the glyphs of a code page 437 bitmap font.
+    GlyphAtlas   -- glyphs of a true type font, rasterized on first use.
+    load_glyphs  -- return a new glyph source for a font and scale.
+    scaled_size  -- the size of a cell at a scale.
+    glyph_masks  -- the coverage masks of glyphs, used for matching images.
+
+Glyph sources map code points to glyph surfaces, white on black, with black
+as the color key.
+
+Glyph sources are made for a scale, the glyphs are scaled once when loaded
+so rendering blits them as they are.
+"""
+
+from typing import Union
+
+import pygame
+import pygame.freetype
+
+from empyro import color
+from empyro.charcode import CharCode, altcodes
+from empyro.coord import Size
+from empyro.font import Font, TTFont
+
+
+def scaled_size(size: Size, scale: float) -> Size:
+    """Return the size of a cell of the given size at a scale."""
+    return Size(max(1, round(size[0] * scale)), max(1, round(size[1] * scale)))
+
+
+class BitmapGlyphs:
+    """The glyphs of a code page 437 font image, at a scale.
+    Characters outside of code page 437 are drawn as a question mark.
+    """
+
+    def __init__(self, font: Font, scale: float = 1):
+        char_width, line_height = scaled_size(font.size, scale)
+        surface = pygame.image.load(font.path).convert()
+        if (char_width, line_height) != tuple(font.size):
+            # nearest neighbour scaling, keeping the pixels of the font sharp
+            surface = pygame.transform.scale(
+                surface, (16 * char_width, 16 * line_height))
+        self.font_surface = surface
+        self.font_surface.set_colorkey(color.BLACK)
+        self._surfaces = [
+            self.font_surface.subsurface(
+                (x * char_width, y * line_height, char_width, line_height))
+            for y in range(16) for x in range(16)
+        ]
+        self._fallback = self._surfaces[altcodes[CharCode.QUESTION_MARK]]
+
+    def get(self, code: int) -> pygame.Surface:
+        """Return the surface of the glyph with the given code point."""
+        try:
+            return self._surfaces[altcodes[code]]
+        except KeyError:
+            return self._fallback
+
+    def touch(self, code: int):
+        pass
+
+    def next_frame(self):
+        pass
+
+
+class GlyphAtlas:
+    """The glyphs of a true type font, rasterized the first time they're
+    used into atlas pages.
+
+    The atlas grows a page at a time up to `max_pages`. After that, the
+    least recently used page is evicted and reused, so memory stays bounded.
+    Pages are marked as used when their glyphs are read or touched, once
+    per frame, see `next_frame`.
+    """
+
+    def __init__(self, font: TTFont, page_size: Size = (16, 16),
+                 max_pages: int = 8, scale: float = 1):
+        pygame.freetype.init()
+        self.font = font
+        # glyphs are rasterized at the scaled point size, not scaled after
+        self.cell_size = scaled_size(font.size, scale)
+        self.page_size = Size(*page_size)
+        self.max_pages = max_pages
+        self._face = pygame.freetype.Font(
+            font.path, max(1, round(font.point_size * scale)))
+        self._face.origin = True
+        self._baseline = self._face.get_sized_ascender()
+        self._pages = []
+        # page -> code points rasterized in the page.
+        self._page_codes = []
+        # page -> frame it was last used in.
+        self._page_used = []
+        # code point -> (glyph surface, page).
+        self._slots = {}
+        self._frame = 0
+
+    def get(self, code: int) -> pygame.Surface:
+        """Return the surface of the glyph with the given code point."""
+        try:
+            surface, page = self._slots[code]
+        except KeyError:
+            surface, page = self._rasterize(code)
+        self._page_used[page] = self._frame
+        return surface
+
+    def touch(self, code: int):
+        """Mark the glyph with the given code point as used in the frame,
+        for glyphs drawn from surfaces made from it, see `get`.
+        """
+        try:
+            self._page_used[self._slots[code][1]] = self._frame
+        except KeyError:
+            pass
+
+    def next_frame(self):
+        """Start a new frame, for tracking the use of pages."""
+        self._frame += 1
+
+    def _free_page(self) -> int:
+        # a page with a free slot, growing the atlas or evicting a page.
+        capacity = self.page_size.width * self.page_size.height
+        for page, codes in enumerate(self._page_codes):
+            if len(codes) < capacity:
+                return page
+        if len(self._pages) < self.max_pages:
+            width, height = self.cell_size
+            page_surface = pygame.Surface(
+                (self.page_size.width * width, self.page_size.height * height))
+            page_surface.set_colorkey(color.BLACK)
+            self._pages.append(page_surface)
+            self._page_codes.append([])
+            self._page_used.append(self._frame)
+            return len(self._pages) - 1
+        page = min(range(len(self._pages)), key=self._page_used.__getitem__)
+        for code in self._page_codes[page]:
+            del self._slots[code]
+        self._page_codes[page].clear()
+        self._pages[page].fill(color.BLACK)
+        return page
+
+    def _rasterize(self, code: int):
+        page = self._free_page()
+        width, height = self.cell_size
+        slot = len(self._page_codes[page])
+        rect = pygame.Rect(slot % self.page_size.width * width,
+                           slot // self.page_size.width * height,
+                           width, height)
+        page_surface = self._pages[page]
+        page_surface.set_clip(rect)
+        self._face.render_to(page_surface, (rect.x, rect.y + self._baseline),
+                             chr(code), fgcolor=color.BRIGHT_WHITE)
+        page_surface.set_clip(None)
+        self._page_codes[page].append(code)
+        self._slots[code] = page_surface.subsurface(rect), page
+        return self._slots[code]
+
+
+def load_glyphs(font: Union[Font, TTFont], scale: float = 1):
+    """Return a new glyph source for the font at a scale, should be called
+    after the display mode is set, the glyphs are converted for the display.
+    Sources are not shared, a `GlyphAtlas` ages its pages by the frames of
+    the terminal rendering it.
+    """
+    if isinstance(font, TTFont):
+        return GlyphAtlas(font, scale=scale)
+    return BitmapGlyphs(font, scale)
+
+
+def glyph_masks(glyphs: Union[BitmapGlyphs, GlyphAtlas], codes, size: Size):
+    """Return the masks of the glyphs with the given code points, an array
+    of shape (glyphs, height, width) of the coverage of the glyph pixels
+    from 0 to 1, see `empyro.image`. Requires numpy.
+    """
+    import numpy as np
+    masks = np.zeros((len(codes), size[1], size[0]))
+    for index, code in enumerate(codes):
+        surface = glyphs.get(code)
+        # glyphs are white on black, any channel gives the coverage
+        pixels = pygame.surfarray.array3d(surface)[:size[0], :size[1], 0]
+        masks[index, :pixels.shape[1], :pixels.shape[0]] = pixels.T / 255
+    return masks
@@ -0,0 +1,161 @@
+"""Box drawing with the line characters of code page 437.
+
+Every line character is described by the weight of its four arms, up,
+down, left and right, each being one of `NONE`, `SINGLE` or `DOUBLE`.
+Drawing a line over cells already holding line characters merges their
+arms, so crossing lines make junctions instead of overwriting each other.
+
+Code page 437 only has characters whose vertical arms have the same weight,
+and so do the horizontal ones, other combinations are drawn with the
+heavier weight.
+
+defines the following:
+    char_for -- the line character with the given arms.
+    arms_of  -- the arms of a line character.
+    merge    -- merge arms into a line character.
+    hline    -- the arms of the cells of a horizontal line.
+    vline    -- the arms of the cells of a vertical line.
+    box      -- the arms of the cells of a rectangle's border.
+"""
+
+from typing import Dict, Tuple, Union
+
+from .charcode import CharCode
+from .coord import Point, Rect
+
+NONE = 0
+SINGLE = 1
+DOUBLE = 2
+
+# arms as (up, down, left, right)
+Arms = Tuple[int, int, int, int]
+
+_ARMS = {
+    0x2500: (0, 0, 1, 1), 0x2502: (1, 1, 0, 0), 0x250c: (0, 1, 0, 1),
+    0x2510: (0, 1, 1, 0), 0x2514: (1, 0, 0, 1), 0x2518: (1, 0, 1, 0),
+    0x251c: (1, 1, 0, 1), 0x2524: (1, 1, 1, 0), 0x252c: (0, 1, 1, 1),
+    0x2534: (1, 0, 1, 1), 0x253c: (1, 1, 1, 1),
+    0x2550: (0, 0, 2, 2), 0x2551: (2, 2, 0, 0), 0x2552: (0, 1, 0, 2),
+    0x2553: (0, 2, 0, 1), 0x2554: (0, 2, 0, 2), 0x2555: (0, 1, 2, 0),
+    0x2556: (0, 2, 1, 0), 0x2557: (0, 2, 2, 0), 0x2558: (1, 0, 0, 2),
+    0x2559: (2, 0, 0, 1), 0x255a: (2, 0, 0, 2), 0x255b: (1, 0, 2, 0),
+    0x255c: (2, 0, 1, 0), 0x255d: (2, 0, 2, 0), 0x255e: (1, 1, 0, 2),
+    0x255f: (2, 2, 0, 1), 0x2560: (2, 2, 0, 2), 0x2561: (1, 1, 2, 0),
+    0x2562: (2, 2, 1, 0), 0x2563: (2, 2, 2, 0), 0x2564: (0, 1, 2, 2),
+    0x2565: (0, 2, 1, 1), 0x2566: (0, 2, 2, 2), 0x2567: (1, 0, 2, 2),
+    0x2568: (2, 0, 1, 1), 0x2569: (2, 0, 2, 2), 0x256a: (1, 1, 2, 2),
+    0x256b: (2, 2, 1, 1), 0x256c: (2, 2, 2, 2),
+}
+
+_CHARS = {arms: CharCode(code) for code, arms in _ARMS.items()}
+
+
+def arms_of(code: Union[CharCode, int]) -> Arms:
+    """Return the arms of a line character, all `NONE` if the character
+    isn't a line character.
+
+    >>> arms_of(CharCode(0x2564))
+    (0, 1, 2, 2)
+    """
+    return _ARMS.get(code, (NONE, NONE, NONE, NONE))
+
+
+def char_for(arms: Arms) -> CharCode:
+    """Return the line character with the given arms, approximated if code
+    page 437 has no such character. A single arm is drawn as a whole line.
+
+    >>> char_for((SINGLE, NONE, DOUBLE, DOUBLE)) == CharCode(0x2567)
+    True
+    >>> char_for((NONE, NONE, NONE, DOUBLE)) == char_for((0, 0, 2, 2))
+    True
+    """
+    try:
+        return _CHARS[arms]
+    except KeyError:
+        pass
+    up, down, left, right = arms
+    vertical, horizontal = max(up, down), max(left, right)
+    if not vertical and not horizontal:
+        raise ValueError('no arms')
+    if not horizontal:
+        up = down = vertical
+    elif not vertical:
+        left = right = horizontal
+    return _CHARS[(up and vertical, down and vertical,
+                   left and horizontal, right and horizontal)]
+
+
+def merge(code: Union[CharCode, int], arms: Arms) -> CharCode:
+    """Return the line character drawn over the character `code`, the new
+    arms replace the old ones where they are set.
+
+    >>> merge(char_for((0, 0, 1, 1)), (2, 2, 0, 0)) == CharCode(0x256b)
+    True
+    """
+    before = _ARMS.get(code)
+    if before is not None:
+        arms = tuple(new or old for new, old in zip(arms, before))
+    return char_for(arms)
+
+
+def _add(cells: Dict[Point, list], at: Point, arm: int, style: int):
+    cells.setdefault(at, [NONE] * 4)[arm] = style
+
+
+def hline(at: Point, length: int, style: int = SINGLE,
+          cells: Dict[Point, list] = None) -> Dict[Point, list]:
+    """Add the arms of a horizontal line to `cells`, a dict of positions
+    and their arms as lists, and return it. The ends of the line only have
+    their inner arm, so they join the lines they meet as corners, a line
+    of a single cell has both arms.
+    """
+    cells = {} if cells is None else cells
+    x, y = at
+    for offset in range(length):
+        point = Point(x + offset, y)
+        cells.setdefault(point, [NONE] * 4)
+        if offset > 0:
+            _add(cells, point, 2, style)
+        if offset < length - 1:
+            _add(cells, point, 3, style)
+    if length == 1:
+        _add(cells, Point(x, y), 2, style)
+        _add(cells, Point(x, y), 3, style)
+    return cells
+
+
+def vline(at: Point, length: int, style: int = SINGLE,
+          cells: Dict[Point, list] = None) -> Dict[Point, list]:
+    """Add the arms of a vertical line to `cells`, see `hline`."""
+    cells = {} if cells is None else cells
+    x, y = at
+    for offset in range(length):
+        point = Point(x, y + offset)
+        cells.setdefault(point, [NONE] * 4)
+        if offset > 0:
+            _add(cells, point, 0, style)
+        if offset < length - 1:
+            _add(cells, point, 1, style)
+    if length == 1:
+        _add(cells, Point(x, y), 0, style)
+        _add(cells, Point(x, y), 1, style)
+    return cells
+
+
+def box(window: Rect, style: int = SINGLE,
+        cells: Dict[Point, list] = None) -> Dict[Point, list]:
+    """Add the arms of the border of a window to `cells`, see `hline`.
+
+    >>> cells = box((0, 0, 3, 2))
+    >>> ''.join(chr(char_for(tuple(cells[x, 0]))) for x in range(3))
+    '┌─┐'
+    """
+    cells = {} if cells is None else cells
+    x, y, width, height = window
+    if width < 2 or height < 2:
+        raise ValueError('box must be at least 2x2')
+    hline((x, y), width, style, cells)
+    hline((x, y + height - 1), width, style, cells)
+    vline((x, y), height, style, cells)
+    vline((x + width - 1, y), height, style, cells)
+    return cells
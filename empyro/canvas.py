@@ -0,0 +1,257 @@
+"""Provide a sparse virtual canvas, and cameras for viewing it.
+
+A canvas is a terminal that can be much larger than the screen. Its cells are
+stored in fixed size chunks of packed glyphs (see `glyph.pack`), allocated
+the first time something is drawn to them, so empty areas cost nothing.
+
+A camera maps a viewport of the canvas onto a terminal. When the camera
+moves, the already drawn part of the viewport is scrolled on the target
+(a single self blit on surface backends) and only the uncovered strips and
+the chunks changed since the last present are drawn.
+
+defines the following:
+    Canvas -- a large, chunked terminal with no input.
+    Camera -- a viewport into a canvas presented onto a terminal.
+"""
+
+from array import array
+from typing import Tuple
+
+from . import glyph
+from .glyph import Glyph
+from .terminal import Terminal
+from .coord import Point, Size, Rect
+
+
+class Canvas(Terminal):
+    """A terminal storing its cells in lazily allocated chunks.
+    Implements `Terminal` ABC, except for input.
+
+    properties:
+        chunk_size -- the size of a chunk in cells, defaults to 16x16.
+
+    >>> canvas = Canvas((1000, 1000))
+    >>> _ = canvas.write('@', (500, 500))
+    >>> canvas.glyph_at((500, 500)).code
+    <CharCode.AT: 64>
+    >>> len(canvas._chunks)
+    1
+    """
+
+    def __init__(self, size: Size = None, chunk_size: Size = None):
+        super().__init__(size)
+        self.chunk_size = Size(*((16, 16) if chunk_size is None
+                                 else chunk_size))
+        # chunk position -> array of the chunk's packed glyphs, row major.
+        self._chunks = {}
+        # chunk position -> number of changes made to the chunk.
+        self._versions = {}
+        glyph.track(self)
+
+    def _packed_arrays(self):
+        return self._chunks.values()
+
+    def _chunk_key(self, at: Point) -> Tuple[int, int]:
+        return at[0] // self.chunk_size.width, at[1] // self.chunk_size.height
+
+    def _chunk_index(self, at: Point) -> int:
+        width, height = self.chunk_size
+        return at[1] % height * width + at[0] % width
+
+    def draw_glyph(self, glyph_: Glyph, at: Point):
+        if at not in self.size:
+            raise ValueError('draw out of bounds')
+        key = self._chunk_key(at)
+        value = glyph.pack(glyph_)
+        chunk = self._chunks.get(key)
+        if chunk is None:
+            if value == glyph.PACKED_CLEAR:
+                return
+            chunk = self._chunks[key] = array(
+                'Q', [glyph.PACKED_CLEAR]) * (self.chunk_size.width *
+                                              self.chunk_size.height)
+        index = self._chunk_index(at)
+        if chunk[index] != value:
+            chunk[index] = value
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+    def resize(self, size: Size):
+        """Resize the canvas, the chunks outside of it are freed."""
+        super().resize(size)
+        chunk_width, chunk_height = self.chunk_size
+        for key in list(self._chunks):
+            x, y = key[0] * chunk_width, key[1] * chunk_height
+            if x >= self.size.width or y >= self.size.height:
+                del self._chunks[key]
+                self._versions.pop(key, None)
+                continue
+            # clear the cells outside of the canvas in partial chunks
+            for index in range(chunk_width * chunk_height):
+                row, column = divmod(index, chunk_width)
+                if (x + column >= self.size.width or
+                        y + row >= self.size.height):
+                    self._chunks[key][index] = glyph.PACKED_CLEAR
+        return self
+
+    def glyph_at(self, at: Point) -> Glyph:
+        """Return the glyph at the specified position."""
+        if at not in self.size:
+            raise ValueError('position out of bounds')
+        chunk = self._chunks.get(self._chunk_key(at))
+        if chunk is None:
+            return glyph.CLEAR
+        return glyph.unpack(chunk[self._chunk_index(at)])
+
+    def copy_to(self, target: Terminal, window: Rect, at: Point = (0, 0)):
+        """Draw the contents of `window` onto `target` at the given position.
+        """
+        if window not in self.size:
+            raise ValueError('window out of bounds')
+        chunk_width, chunk_height = self.chunk_size
+        x0, y0, width, height = window
+        dy = at[1] - y0
+        unpack = glyph.unpack
+        for y in range(y0, y0 + height):
+            chunk_y, row = divmod(y, chunk_height)
+            span = []
+            x = x0
+            while x < x0 + width:
+                chunk_x = x // chunk_width
+                end = min(x0 + width, (chunk_x + 1) * chunk_width)
+                chunk = self._chunks.get((chunk_x, chunk_y))
+                if chunk is None:
+                    span.extend([glyph.CLEAR] * (end - x))
+                else:
+                    start = row * chunk_width + x - chunk_x * chunk_width
+                    span.extend(map(unpack, chunk[start:start + end - x]))
+                x = end
+            target.draw_span(span, Point(at[0], y + dy))
+        return self
+
+    def get_key(self):
+        raise NotImplementedError('canvas has no input')
+
+
+class Camera:
+    """A viewport into a canvas, presented onto a terminal.
+
+    properties:
+        canvas   -- the viewed canvas.
+        target   -- the terminal the viewport is presented onto, its size
+                    is the size of the viewport.
+        position -- the top left corner of the viewport in the canvas.
+
+    >>> canvas = Canvas((100, 100))
+    >>> _ = canvas.write('hello', (50, 50))
+    >>> screen = Canvas((10, 5))
+    >>> camera = Camera(canvas, screen).move_to((48, 48)).present()
+    >>> screen.glyph_at((2, 2)).code
+    <CharCode.H_LOWER: 104>
+    >>> camera.position
+    Point(x=48, y=48)
+    >>> camera.move_to((1000, 1000)).position
+    Point(x=90, y=95)
+    """
+
+    def __init__(self, canvas: Canvas, target: Terminal,
+                 position: Point = (0, 0)):
+        self.canvas = canvas
+        self.target = target
+        self.position = Point(0, 0)
+        self.move_to(position)
+        # the viewport as of the last present, None to redraw all of it.
+        self._presented = None
+        # visible chunk position -> its version as of the last present.
+        self._seen = {}
+
+    @property
+    def viewport(self) -> Rect:
+        """The part of the canvas presented onto the target."""
+        return Rect(self.position.x, self.position.y,
+                    self.target.size.width, self.target.size.height)
+
+    def move_to(self, at: Point):
+        """Move the viewport, keeping it inside the canvas."""
+        canvas_size, target_size = self.canvas.size, self.target.size
+        self.position = Point(
+            max(0, min(at[0], canvas_size.width - target_size.width)),
+            max(0, min(at[1], canvas_size.height - target_size.height)))
+        return self
+
+    def pan(self, dx: int, dy: int):
+        """Move the viewport by dx and dy cells."""
+        return self.move_to((self.position.x + dx, self.position.y + dy))
+
+    def invalidate(self):
+        """Redraw the whole viewport on the next present.
+        Use it when the target has been drawn to by something else.
+        """
+        self._presented = None
+        return self
+
+    def present(self):
+        """Draw the viewport onto the target, drawing only what changed."""
+        # keep the viewport inside the canvas if either has been resized
+        self.move_to(self.position)
+        viewport = self.viewport
+        if viewport not in self.canvas.size:
+            raise ValueError('viewport out of canvas bounds')
+        visible = self._visible_chunks(viewport)
+        versions = self.canvas._versions
+        changed = [key for key in visible
+                   if key in self._seen and
+                   versions.get(key, 0) != self._seen[key]]
+        last = self._presented
+        if last is None or last.size != viewport.size:
+            self._draw(viewport, viewport)
+        else:
+            # contents move opposite to the camera
+            dx, dy = last.x - viewport.x, last.y - viewport.y
+            if dx or dy:
+                self._scroll(viewport, dx, dy)
+            for key in changed:
+                self._draw(viewport, self._chunk_rect(key))
+        self._presented = viewport
+        self._seen = {key: versions.get(key, 0) for key in visible}
+        return self
+
+    def _scroll(self, viewport: Rect, dx: int, dy: int):
+        width, height = viewport.size
+        if abs(dx) >= width or abs(dy) >= height:
+            self._draw(viewport, viewport)
+            return
+        try:
+            self.target.scroll(self.target.size, dx, dy)
+        except NotImplementedError:
+            self._draw(viewport, viewport)
+            return
+        # draw the uncovered strips
+        if dx:
+            x = viewport.x if dx > 0 else viewport.x + width + dx
+            self._draw(viewport, Rect(x, viewport.y, abs(dx), height))
+        if dy:
+            y = viewport.y if dy > 0 else viewport.y + height + dy
+            self._draw(viewport, Rect(viewport.x, y, width, abs(dy)))
+
+    def _draw(self, viewport: Rect, window: Rect):
+        # draw the part of the window inside the viewport.
+        x0, y0 = max(viewport.x, window.x), max(viewport.y, window.y)
+        x1 = min(viewport.x + viewport.width, window.x + window.width)
+        y1 = min(viewport.y + viewport.height, window.y + window.height)
+        if x0 < x1 and y0 < y1:
+            self.canvas.copy_to(self.target, Rect(x0, y0, x1 - x0, y1 - y0),
+                                Point(x0 - viewport.x, y0 - viewport.y))
+
+    def _chunk_rect(self, key: Tuple[int, int]) -> Rect:
+        width, height = self.canvas.chunk_size
+        return Rect(key[0] * width, key[1] * height, width, height)
+
+    def _visible_chunks(self, viewport: Rect):
+        width, height = self.canvas.chunk_size
+        return [
+            (x, y)
+            for y in range(viewport.y // height,
+                           (viewport.y + viewport.height - 1) // height + 1)
+            for x in range(viewport.x // width,
+                           (viewport.x + viewport.width - 1) // width + 1)
+        ]
@@ -1,17 +1,21 @@
 """Provide color class and manipulation methods.
 
 defines the following:
-    Color -- class for representing a color in rgb format.
+    Color   -- class for representing a color in rgb format.
+    Palette -- an indexed list of colors, used by terminals in palette mode.
     Some color constants, provided for convenience.
 """
 
-from typing import NamedTuple
+from typing import NamedTuple, Iterable
 
 _Color = NamedTuple('Color', [('r', int), ('g', int), ('b', int)])
 
 
 class Color(_Color):
     """Represent an rgb color value."""
+
+    __slots__ = ()
+
     def add(self, other: 'Color', fraction_other: float = 1.0):
         """Add one color to another and return it.
 
@@ -55,6 +59,55 @@ class Color(_Color):
         return self.r ^ self.g ^ self.b
 
 
+class Palette:
+    """An indexed list of up to 256 colors.
+
+    Glyphs drawn to a terminal in palette mode may use an index into the
+    palette (an int) in place of a color, so changing a palette entry
+    recolors every cell using it. See `DrawMixin.set_palette`.
+
+    >>> palette = Palette([BLACK, WHITE])
+    >>> palette[1] == WHITE
+    True
+    >>> palette.append((255, 0, 0))
+    2
+    >>> len(palette)
+    3
+    >>> Palette([BLACK] * 257)
+    Traceback (most recent call last):
+        ...
+    ValueError: palette can hold at most 256 colors
+    """
+
+    MAX_SIZE = 256
+
+    def __init__(self, colors: Iterable[Color] = ()):
+        self._colors = [Color(*c) for c in colors]
+        if len(self._colors) > self.MAX_SIZE:
+            raise ValueError('palette can hold at most {} colors'
+                             .format(self.MAX_SIZE))
+
+    def __getitem__(self, index: int) -> Color:
+        return self._colors[index]
+
+    def __setitem__(self, index: int, color: Color):
+        self._colors[index] = Color(*color)
+
+    def __len__(self) -> int:
+        return len(self._colors)
+
+    def __iter__(self):
+        return iter(self._colors)
+
+    def append(self, color: Color) -> int:
+        """Add a color to the end of the palette and return its index."""
+        if len(self._colors) >= self.MAX_SIZE:
+            raise ValueError('palette can hold at most {} colors'
+                             .format(self.MAX_SIZE))
+        self._colors.append(Color(*color))
+        return len(self._colors) - 1
+
+
 BLACK = Color(0, 0, 0)
 RED = Color(128, 0, 0)
 GREEN = Color(0, 128, 0)
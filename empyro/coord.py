@@ -26,6 +26,8 @@ class Rect(_Rect):
         top_left, top_right, bottom_right
     """
 
+    __slots__ = ()
+
     @property
     def size(self) -> Size:
         """The size of the rectangle.
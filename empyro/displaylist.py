@@ -0,0 +1,130 @@
+"""Provide display lists, recordings of drawing operations that can be
+replayed onto any terminal.
+
+A display list is a terminal recording what is drawn to it as horizontal
+spans of glyphs. The glyphs are built and the bounds of the spans are
+checked when recording. Replaying checks the bounds of the whole list
+once, and draws the spans without checking them again, through the root
+of any views replayed to (see `Terminal._draw_span_unchecked`).
+
+The glyphs keep their char codes, the code page indices are looked up by
+backends when rendering, as for any other glyph.
+
+defines the following:
+    DisplayList -- a terminal recording the draws made to it.
+"""
+
+from typing import Sequence
+
+from .glyph import Glyph
+from .terminal import Terminal
+from .coord import Point, Size, Rect
+
+
+class DisplayList(Terminal):
+    """A recording of drawing operations, replayable onto terminals.
+    Implements `Terminal` ABC, except for input.
+
+    Display lists compare equal if they record the same spans, and are
+    hashable, so replaying an unchanged list can be skipped. Don't modify
+    a list while it is used as a dict key.
+
+    >>> header = DisplayList((10, 1)).write('HP', (0, 0))
+    >>> hud = DisplayList((10, 2)).extend(header, (1, 1))
+    >>> len(hud)
+    1
+    >>> hud == DisplayList((10, 2)).write('HP', (1, 1))
+    True
+    >>> _ = hud.extend(header, (9, 0))  # clipped to the list size
+    >>> hud._spans[-1][:2]
+    (9, 0)
+    """
+
+    def __init__(self, size: Size = None):
+        super().__init__(size)
+        # list of (x, y, list of glyphs)
+        self._spans = []
+        self._hash = None
+
+    def _record(self, glyphs: list, at: Point):
+        self._hash = None
+        if self._spans:
+            x, y, last = self._spans[-1]
+            # merge with the previous span if it ends where this one starts
+            if y == at[1] and x + len(last) == at[0]:
+                last.extend(glyphs)
+                return
+        self._spans.append((at[0], at[1], glyphs))
+
+    def draw_glyph(self, glyph_: Glyph, at: Point):
+        if at not in self.size:
+            raise ValueError('draw out of bounds')
+        self._record([glyph_], at)
+
+    def draw_span(self, glyphs: Sequence[Glyph], at: Point):
+        if not glyphs:
+            return
+        if at not in self.size or at[0] + len(glyphs) > self.size.width:
+            raise ValueError('draw out of bounds')
+        self._record(list(glyphs), at)
+
+    def _draw_span_unchecked(self, glyphs: Sequence[Glyph], at: Point):
+        self._record(list(glyphs), at)
+
+    def extend(self, other: 'DisplayList', at: Point = (0, 0)):
+        """Append the spans of another display list, drawn at the given
+        position. The parts falling outside of the list are clipped.
+        """
+        return self._extend(other._spans, at)
+
+    def _extend(self, spans, at: Point = (0, 0)):
+        width, height = self.size.width, self.size.height
+        for x, y, glyphs in spans:
+            x, y = x + at[0], y + at[1]
+            if not 0 <= y < height:
+                continue
+            start, end = max(0, -x), min(len(glyphs), width - x)
+            if start < end:
+                self._record(glyphs[start:end], (x + start, y))
+        return self
+
+    def resize(self, size: Size):
+        """Resize the list, clipping the spans to the new size."""
+        super().resize(size)
+        spans, self._spans = self._spans, []
+        self._hash = None
+        self._extend(spans)
+        return self
+
+    def replay(self, target: Terminal, at: Point = (0, 0)):
+        """Draw the recorded spans onto `target`, offset by `at`."""
+        if Rect(at[0], at[1], *self.size.size) not in target.size:
+            raise ValueError('display list out of bounds')
+        draw_span = target._draw_span_unchecked
+        x0, y0 = at
+        for x, y, glyphs in self._spans:
+            draw_span(glyphs, Point(x0 + x, y0 + y))
+        return self
+
+    def reset(self):
+        """Remove all the recorded spans."""
+        self._spans.clear()
+        self._hash = None
+        return self
+
+    def get_key(self):
+        raise NotImplementedError('display list has no input')
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, DisplayList):
+            return NotImplemented
+        return self.size == other.size and self._spans == other._spans
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash((self.size, tuple(
+                (x, y, tuple(glyphs)) for x, y, glyphs in self._spans)))
+        return self._hash
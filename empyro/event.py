@@ -0,0 +1,61 @@
+"""Input events, read in batches with `Terminal.read_events`.
+
+A batch holds every event pending since the last read, coalesced so that
+its length is bounded however many events arrived: repeats of a key are
+merged into a single `KeyPress` with a count, and mouse motion is reduced
+to the latest position, kept in order with the other events.
+
+defines the following:
+    KeyPress    -- a key pressed `count` times in a row.
+    MouseClick  -- a mouse button pressed over a cell.
+    MouseMotion -- the mouse moved over a cell.
+    coalesce    -- coalesce a sequence of events into a batch.
+"""
+
+from typing import Iterable, List, NamedTuple, Union
+
+from .coord import Point
+from .key import Key
+
+KeyPress = NamedTuple('KeyPress', [('key', Key), ('count', int)])
+KeyPress.__new__.__defaults__ = (1,)
+
+MouseClick = NamedTuple('MouseClick', [('at', Point), ('button', int)])
+
+MouseMotion = NamedTuple('MouseMotion', [('at', Point)])
+
+Event = Union[KeyPress, MouseClick, MouseMotion]
+
+
+def coalesce(events: Iterable[Event]) -> List[Event]:
+    """Coalesce events into a batch. Consecutive presses of the same key
+    are merged, and the motion events are reduced to the last one, which
+    stays where it was among the other events.
+
+    >>> from empyro.key import KeyCode, KeyMod
+    >>> up = Key(KeyCode.UP, KeyMod.NO_MOD)
+    >>> coalesce([MouseMotion((1, 1)), KeyPress(up), KeyPress(up, 2),
+    ...           MouseMotion((2, 1)), MouseClick((2, 1), 1)])
+    ... # doctest: +NORMALIZE_WHITESPACE
+    [KeyPress(key=Key(code=<KeyCode.UP: 273>, mod=<KeyMod.NO_MOD: 0>),
+              count=3),
+     MouseMotion(at=(2, 1)), MouseClick(at=(2, 1), button=1)]
+    """
+    events = list(events)
+    last_motion = None
+    for index, event in enumerate(events):
+        if isinstance(event, MouseMotion):
+            last_motion = index
+    batch = []
+    for index, event in enumerate(events):
+        if isinstance(event, MouseMotion):
+            if index == last_motion:
+                batch.append(event)
+            continue
+        if (isinstance(event, KeyPress) and batch and
+                isinstance(batch[-1], KeyPress) and
+                batch[-1].key == event.key):
+            batch[-1] = KeyPress(event.key, batch[-1].count + event.count)
+            continue
+        batch.append(event)
+    return batch
@@ -2,11 +2,17 @@
 
 Fonts are images with 16x16 glyphs.
 
-Several fonts are loaded by default. Importing this module will
-automatically load the fonts in the resources package.
+Several fonts are loaded by default. The fonts in the resources package
+are discovered the first time a font missing from this module is looked
+up, such as `font.CP437_9x16`, so importing the module doesn't scan the
+resources directory.
+
+True type fonts are supported as well, for characters outside of code
+page 437. Their glyphs are rasterized by the backend when first used.
 
 defines the following:
     Font -- a namedtuple that hold the properties of the font.
+    TTFont -- a namedtuple that hold the properties of a true type font.
     load_fonts -- helper function for auto discovery of fonts.
 """
 import sys
@@ -20,6 +26,12 @@ Font = NamedTuple('Font', [
     ('size', Size), ('path', Text), ('filename', Text)
 ])
 
+# size is the size of a cell, glyphs are rendered using point_size.
+# a path of None uses the backend's default font.
+TTFont = NamedTuple('TTFont', [
+    ('size', Size), ('path', Text), ('point_size', int)
+])
+
 
 def load_fonts(path: Text = None):
     """Discover all files in the directory given by `path`
@@ -52,4 +64,30 @@ def load_fonts(path: Text = None):
     return load_to
 
 
-load_fonts()
+# whether the fonts in the resources package were loaded.
+_loaded = False
+
+
+def _load_default_fonts() -> bool:
+    # load the fonts in the resources package the first time it's called,
+    # return whether they were loaded by this call.
+    global _loaded
+    if _loaded:
+        return False
+    _loaded = True
+    load_fonts()
+    return True
+
+
+def __getattr__(name: Text):
+    # called for missing attributes, the default fonts are loaded on the
+    # first one.
+    if _load_default_fonts() and name in globals():
+        return globals()[name]
+    raise AttributeError(
+        'module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+def __dir__():
+    _load_default_fonts()
+    return list(globals())
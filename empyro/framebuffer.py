@@ -0,0 +1,252 @@
+"""Export the rendered cells of a terminal through a memory mapped file,
+so other processes can read the screen without calling into the process
+drawing it.
+
+The file has a fixed layout, in the byte order of the machine:
+    offset  0 -- magic, the 8 bytes b'EMPYROFB'.
+    offset  8 -- uint32, the layout version, currently 2.
+    offset 12 -- uint32, the width of the terminal in cells.
+    offset 16 -- uint32, the height of the terminal in cells.
+    offset 20 -- uint32, reserved, 0.
+    offset 24 -- uint64, the frame sequence number.
+    offset 32 -- uint64 per cell, row major, the packed glyphs of the
+                 cells (see `glyph.pack`) with their colors resolved, never
+                 palette indices. Code slots below 256 are code page 437
+                 alt codes (see `charcode.code_points`), higher slots are
+                 characters outside of the code page, known only to the
+                 writing process.
+    then      -- uint32 per cell, row major, the code points of the cells,
+                 starting right after the packed glyphs.
+
+The sequence number works as a seqlock: it's odd while a frame is being
+written, and even once it's complete. A reader copies the cells between
+two reads of an even sequence number, and keeps the copy if both reads
+are equal. A new frame is one with a greater sequence number.
+
+defines the following:
+    FrameBuffer       -- writes frames to a memory mapped file.
+    FrameBufferReader -- reads frames from a memory mapped file.
+    Frame             -- a frame read from a frame buffer.
+"""
+
+import mmap
+import struct
+import time
+from array import array
+from contextlib import contextmanager
+from typing import Iterable, NamedTuple, Optional, Text, Tuple
+
+from . import glyph
+from .coord import Point, Size
+
+MAGIC = b'EMPYROFB'
+VERSION = 2
+
+# magic, version, width, height, reserved, sequence number
+_HEADER = struct.Struct('=8sIIIIQ')
+_SEQ = struct.Struct('=Q')
+_SEQ_OFFSET = 24
+
+# a packed glyph and a code point
+_GLYPH_SIZE = 8
+_CELL_SIZE = _GLYPH_SIZE + 4
+
+Frame = NamedTuple('Frame', [
+    ('seq', int), ('size', Size), ('cells', array), ('codes', array)
+])
+
+
+def _file_size(size: Size) -> int:
+    return _HEADER.size + size[0] * size[1] * _CELL_SIZE
+
+
+def _codes_offset(size: Size) -> int:
+    return _HEADER.size + size[0] * size[1] * _GLYPH_SIZE
+
+
+class FrameBuffer:
+    """Writes the frames of a terminal to a memory mapped file.
+
+    Terminals using `DrawMixin` write their frames with
+    `DrawMixin.export_frames`.
+
+    properties:
+        path -- the path of the file.
+        size -- the size of the frames in cells.
+        seq  -- the sequence number of the last frame written.
+
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'frame')
+    >>> buffer = FrameBuffer(path, (4, 2))
+    >>> with buffer.frame():
+    ...     _ = buffer.write([(Point(1, 1), glyph.pack(glyph.Glyph('@'))),
+    ...                       (Point(2, 1), glyph.pack(glyph.Glyph('€')))])
+    >>> reader = FrameBufferReader(path)
+    >>> frame = reader.read()
+    >>> frame.seq, frame.size, chr(reader.code_at(frame, (1, 1)))
+    (2, Size(width=4, height=2), '@')
+    >>> hex(reader.code_at(frame, (2, 1)))
+    '0x20ac'
+    >>> reader.close(); buffer.close()
+    """
+
+    def __init__(self, path: Text, size: Size):
+        self.path = path
+        self.size = Size(*size)
+        self.seq = 0
+        self._file = open(path, 'w+b')
+        self._mmap = None
+        self._cells = None
+        self._codes = None
+        self._map()
+        self._clear()
+
+    def _map(self):
+        # the file never shrinks, so readers still mapping a larger frame
+        # don't read past its end.
+        self._file.seek(0, 2)
+        if self._file.tell() < _file_size(self.size):
+            self._file.truncate(_file_size(self.size))
+        self._mmap = mmap.mmap(self._file.fileno(), _file_size(self.size))
+        _HEADER.pack_into(self._mmap, 0, MAGIC, VERSION, self.size.width,
+                          self.size.height, 0, self.seq)
+        codes = _codes_offset(self.size)
+        self._cells = memoryview(self._mmap)[_HEADER.size:codes].cast('Q')
+        self._codes = memoryview(self._mmap)[codes:].cast('I')
+
+    def _unmap(self):
+        self._cells.release()
+        self._codes.release()
+        self._mmap.close()
+
+    def _clear(self):
+        count = self.size.width * self.size.height
+        self._cells[:] = array('Q', [glyph.PACKED_CLEAR]) * count
+        self._codes[:] = array(
+            'I', [glyph.code_of(glyph.PACKED_CLEAR)]) * count
+
+    def _set_seq(self, seq: int):
+        self.seq = seq
+        _SEQ.pack_into(self._mmap, _SEQ_OFFSET, seq)
+
+    def begin(self):
+        """Start writing a frame, readers wait until it ends."""
+        if not self.seq & 1:
+            self._set_seq(self.seq + 1)
+        return self
+
+    def end(self):
+        """End the frame, making it visible to readers."""
+        if self.seq & 1:
+            self._set_seq(self.seq + 1)
+        return self
+
+    @contextmanager
+    def frame(self):
+        """Write a frame in the `with` block, see `begin` and `end`."""
+        self.begin()
+        try:
+            yield self
+        finally:
+            self.end()
+
+    def write(self, cells: Iterable[Tuple[Point, int]]):
+        """Write packed glyphs to the cells at the given positions,
+        should be called while writing a frame.
+        """
+        width, buffer, codes = self.size.width, self._cells, self._codes
+        code_of = glyph.code_of
+        for at, value in cells:
+            index = at[1] * width + at[0]
+            buffer[index] = value
+            codes[index] = code_of(value)
+        return self
+
+    def resize(self, size: Size):
+        """Resize the frames, clearing the cells. Should be called while
+        writing a frame, the frame has to write all the cells.
+        """
+        self._unmap()
+        self.size = Size(*size)
+        self._map()
+        self._clear()
+        return self
+
+    def close(self):
+        self._unmap()
+        self._file.close()
+
+
+class FrameBufferReader:
+    """Reads the frames written to a memory mapped file by a `FrameBuffer`.
+
+    properties:
+        path     -- the path of the file.
+        last_seq -- the sequence number of the last frame read.
+    """
+
+    def __init__(self, path: Text):
+        self.path = path
+        self.last_seq = 0
+        self._file = open(path, 'rb')
+        self._mmap = None
+        self._size = None
+        self._remap()
+
+    def _remap(self):
+        if self._mmap is not None:
+            self._mmap.close()
+        self._mmap = mmap.mmap(self._file.fileno(), 0,
+                               access=mmap.ACCESS_READ)
+        magic, version, width, height, _, _ = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('not a version {} frame buffer'.format(VERSION))
+        self._size = Size(width, height)
+
+    @property
+    def seq(self) -> int:
+        """The sequence number of the frame being written or last written.
+        """
+        return _SEQ.unpack_from(self._mmap, _SEQ_OFFSET)[0]
+
+    def read(self, retries: int = 1000) -> Optional[Frame]:
+        """Return a copy of the current frame, or None if no complete frame
+        could be read in `retries` attempts.
+        """
+        for _ in range(retries):
+            seq = self.seq
+            if seq & 1:
+                time.sleep(0)
+                continue
+            width, height = _HEADER.unpack_from(self._mmap)[2:4]
+            if (Size(width, height) != self._size or
+                    len(self._mmap) < _file_size(self._size)):
+                # resized by the writer
+                self._remap()
+                continue
+            start = _codes_offset(self._size)
+            end = _file_size(self._size)
+            cells = array('Q', self._mmap[_HEADER.size:start])
+            codes = array('I', self._mmap[start:end])
+            if self.seq == seq:
+                self.last_seq = seq
+                return Frame(seq, self._size, cells, codes)
+        return None
+
+    def poll(self) -> Optional[Frame]:
+        """Return the current frame if it's newer than the last frame read,
+        otherwise None.
+        """
+        seq = self.seq
+        if seq & 1 or seq <= self.last_seq:
+            return None
+        return self.read()
+
+    @staticmethod
+    def code_at(frame: Frame, at: Point) -> int:
+        """Return the code point of a cell in a frame."""
+        return frame.codes[at[1] * frame.size.width + at[0]]
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
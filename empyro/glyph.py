@@ -1,13 +1,35 @@
 """Glyph support for terminal character creation.
 
-defines Glyph class.
+defines the following:
+    Glyph   -- class for representing a character and its colors.
+    pack    -- pack a glyph into a single int, the packed cell format.
+    unpack  -- unpack a packed glyph.
+    code_of -- the code point of a packed glyph.
+    track   -- keep the characters of a store of packed glyphs packable.
+
+Packed glyphs are 64 bit unsigned ints, suitable for compact storage
+(such as in an `array.array('Q')`). From the least significant bit:
+    14 bits -- code slot, the alt code for code page 437 characters,
+               other code points are given the next free slot.
+    24 bits -- foreground color as 0xRRGGBB, or a palette index.
+    24 bits -- background color as 0xRRGGBB, or a palette index.
+     1 bit  -- set if the foreground color is a palette index.
+     1 bit  -- set if the background color is a palette index.
+
+The slots of other code points are local to the process. When they run
+out, the slots no longer used by the packed glyphs of any tracked store
+(such as canvases and cached views, see `track`) are reclaimed, so packed
+glyphs kept anywhere else should be unpacked or packed again before packing
+more characters, `code_of` returns the code point of a packed glyph.
 """
 
+import weakref
+from functools import lru_cache
 from typing import NamedTuple, Union, Text
 
 from . import color
-from .color import Color
-from .charcode import CharCode
+from .color import Color, Palette
+from .charcode import CharCode, altcodes, code_points
 
 
 _Glyph = NamedTuple('Glyph', [
@@ -21,17 +43,179 @@ class Glyph(_Glyph):
     """Represent a glyph
 
     code     -- a unicode code point or a character (str of length 1).
+                stored as a `CharCode` if the character is in code page 437,
+                otherwise as an int.
     fg_color -- the foreground color of the glyph.
     bg_color -- the background color of the glyph.
+
+    Colors can also be palette indices (ints), for terminals in
+    palette mode.
+
+    >>> Glyph('a', 3, (1, 2, 3)).fg_color
+    3
+    >>> Glyph('a', 3, (1, 2, 3)).bg_color == Color(1, 2, 3)
+    True
+    >>> Glyph(0x263a).code
+    <CharCode.WHITE_SMILING_FACE: 9786>
+    >>> Glyph('\u20ac').code
+    8364
     """
+
+    __slots__ = ()
+
     def __new__(cls, code: Union[Text, CharCode],
-                 fg_color: Color = None,
-                 bg_color: Color = None):
+                 fg_color: Union[Color, int] = None,
+                 bg_color: Union[Color, int] = None):
         if not isinstance(code, CharCode):
-            code = CharCode(ord(code))
-        fg_color = color.WHITE if fg_color is None else Color(*fg_color)
-        bg_color = color.BLACK if bg_color is None else Color(*bg_color)
+            code = ord(code) if isinstance(code, str) else code
+            code = _charcodes.get(code, code)
+        fg_color = _color(fg_color, color.WHITE)
+        bg_color = _color(bg_color, color.BLACK)
         return super().__new__(cls, code, fg_color, bg_color)
 
 
+# code point -> char code.
+_charcodes = {code.value: code for code in CharCode.__members__.values()}
+
+
+def _color(value, default: Color):
+    if value is None:
+        return default
+    # palette indices are kept as is
+    if isinstance(value, int):
+        if not 0 <= value < Palette.MAX_SIZE:
+            raise ValueError('palette index out of range')
+        return value
+    # colors are shared between glyphs rather than copied
+    if type(value) is Color:
+        return value
+    return Color(*value)
+
+
 CLEAR = Glyph(CharCode.SPACE)
+
+
+_FG_SHIFT = 14
+_BG_SHIFT = 38
+_FG_INDEX = 1 << 62
+_BG_INDEX = 1 << 63
+_SLOT_MASK = (1 << _FG_SHIFT) - 1
+_COLOR_MASK = (1 << 24) - 1
+
+_MAX_SLOTS = 1 << _FG_SHIFT
+
+# code slot -> code point, None for reclaimed slots, and back.
+_slots = [_charcodes[code] for code in code_points]
+_code_slots = dict(altcodes)
+_free_slots = []
+_FIRST_FREE_SLOT = len(_slots)
+
+# objects keeping packed glyphs, see `track`.
+_stores = weakref.WeakSet()
+
+
+def track(store):
+    """Keep the slots of the packed glyphs of a store from being reclaimed,
+    as long as the store is alive. `store._packed_arrays()` returns the
+    sequences of packed glyphs the store keeps.
+    """
+    _stores.add(store)
+    return store
+
+
+def _reclaim_slots():
+    # free the slots not used by any tracked store, the cached packed and
+    # unpacked glyphs may use them and are dropped.
+    used = set()
+    for store in list(_stores):
+        for values in store._packed_arrays():
+            used.update(value & _SLOT_MASK for value in values)
+    for slot in range(_FIRST_FREE_SLOT, len(_slots)):
+        code = _slots[slot]
+        if code is not None and slot not in used:
+            del _code_slots[code]
+            _slots[slot] = None
+            _free_slots.append(slot)
+    pack.cache_clear()
+    unpack.cache_clear()
+
+
+def _code_slot(code: int) -> int:
+    try:
+        return _code_slots[code]
+    except KeyError:
+        pass
+    if not _free_slots and len(_slots) >= _MAX_SLOTS:
+        _reclaim_slots()
+    if _free_slots:
+        slot = _free_slots.pop()
+        _slots[slot] = code
+    elif len(_slots) < _MAX_SLOTS:
+        slot = len(_slots)
+        _slots.append(code)
+    else:
+        raise ValueError('too many distinct characters in use to pack')
+    _code_slots[code] = slot
+    return slot
+
+
+def _pack_color(value) -> int:
+    if isinstance(value, int):
+        return value
+    return value[0] << 16 | value[1] << 8 | value[2]
+
+
+def _unpack_color(value: int, is_index: bool):
+    if is_index:
+        return value
+    return Color(value >> 16, value >> 8 & 0xff, value & 0xff)
+
+
+@lru_cache(maxsize=4096)
+def pack(glyph_: Glyph) -> int:
+    """Pack a glyph into an int, see the module docs for the layout.
+
+    >>> pack(CLEAR) == pack(Glyph(' '))
+    True
+    >>> unpack(pack(Glyph('@', (1, 2, 3), 7))) == Glyph('@', (1, 2, 3), 7)
+    True
+    >>> unpack(pack(Glyph('\u20ac'))).code
+    8364
+
+    Slots are reclaimed when they run out:
+
+    >>> all(unpack(pack(Glyph(chr(code)))).code == code
+    ...     for code in range(0x4e00, 0x4e00 + 2 * _MAX_SLOTS))
+    True
+    """
+    fg, bg = glyph_.fg_color, glyph_.bg_color
+    value = (_code_slot(glyph_.code) |
+             _pack_color(fg) << _FG_SHIFT |
+             _pack_color(bg) << _BG_SHIFT)
+    if isinstance(fg, int):
+        value |= _FG_INDEX
+    if isinstance(bg, int):
+        value |= _BG_INDEX
+    return value
+
+
+@lru_cache(maxsize=4096)
+def unpack(value: int) -> Glyph:
+    """Unpack a glyph packed with `pack`."""
+    return _Glyph.__new__(
+        Glyph,
+        _slots[value & _SLOT_MASK],
+        _unpack_color(value >> _FG_SHIFT & _COLOR_MASK, value & _FG_INDEX),
+        _unpack_color(value >> _BG_SHIFT & _COLOR_MASK, value & _BG_INDEX))
+
+
+def code_of(value: int) -> int:
+    """Return the code point of a packed glyph.
+
+    >>> code_of(pack(Glyph('\u20ac')))
+    8364
+    """
+    return _slots[value & _SLOT_MASK]
+
+
+PACKED_CLEAR = pack(CLEAR)
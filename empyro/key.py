@@ -1,6 +1,14 @@
 """The keycodes used by the terminal for signaling input.
 
 Note that the backend used might not signal all control keys.
+
+The names of the keys are computed once, `by_name` maps the lower case
+names of the keys, and the characters of the printable ones, to their codes.
+
+>>> KeyCode.PERIOD.name, KeyCode.FIVE.name, KeyCode.ESCAPE.is_control
+('.', '5', True)
+>>> by_name['.'], by_name['space']
+(<KeyCode.PERIOD: 46>, <KeyCode.SPACE: 32>)
 """
 
 from functools import wraps
@@ -68,33 +76,21 @@ class KeyCode(IntEnum):
     EQUALS = 61
     COMMA = 44
     HYPHEN = 45
-    PERIOD = 50
-    SLASH = 51
-    BACKTICK = 52
-    LEFTBRACKET = 53
-    BACKSLASH = 54
-    RIGHTBRACKET = 55
-    APOSTROPHE = 56
+    PERIOD = 46
+    SLASH = 47
+    BACKTICK = 96
+    LEFTBRACKET = 91
+    BACKSLASH = 92
+    RIGHTBRACKET = 93
+    APOSTROPHE = 39
 
     @property
     def name(self) -> chr:
-        # numbers
-        if self in range(KeyCode.ZERO, KeyCode.NINE + 1):
-            return chr(ord('0') + self - KeyCode.ZERO)
-        # symbols
-        if self in range(KeyCode.SEMICOLON, KeyCode.APOSTROPHE + 1):
-            return _symbols_names[self]
-        # control keys
-        if self == KeyCode.SPACE:
-            return ' '
-        if self == KeyCode.TAB:
-            return '    '
-        # letters, numbers and other control characters
-        return super().name
+        return _names[self]
 
     @property
     def is_control(self) -> bool:
-        return self in range(KeyCode.SPACE, KeyCode.ESCAPE + 1)
+        return self in _control_keys
 
 
 class KeyMod(IntEnum):
@@ -119,3 +115,22 @@ _symbols_names = {
     KeyCode.RIGHTBRACKET: ']',
     KeyCode.APOSTROPHE: "'",
 }
+
+_control_keys = frozenset((KeyCode.SPACE, KeyCode.TAB, KeyCode.ENTER,
+                           KeyCode.BACKSPACE, KeyCode.DELETE, KeyCode.ESCAPE))
+
+# the names of the keys, computed once: the character for numbers, symbols,
+# space and tab, the member name for the others.
+_names = {code: name for name, code in KeyCode.__members__.items()}
+_names.update({KeyCode(value): chr(value)
+               for value in range(KeyCode.ZERO, KeyCode.NINE + 1)})
+_names.update(_symbols_names)
+_names[KeyCode.SPACE] = ' '
+_names[KeyCode.TAB] = '    '
+
+# lower case names -> key codes, including the member names of the keys
+# named by their characters.
+by_name = {name.lower(): code
+           for name, code in KeyCode.__members__.items()}
+by_name.update({name.lower(): code for code, name in _names.items()
+                if code != KeyCode.TAB})
@@ -0,0 +1,287 @@
+"""Key bindings dispatched in constant time.
+
+A key and its modifiers are packed into a single int, and the bindings of a
+keymap are kept in a trie of dicts keyed by packed keys, so single keys and
+multi key chords, such as `'ctrl+x ctrl+s'`, are matched with one dict
+lookup per key pressed, no matter how many bindings there are.
+
+Keymaps are stacked for modal screens, the top keymap overriding the ones
+beneath it. The stack merges its keymaps into one trie when it changes, so
+dispatching doesn't depend on the depth of the stack either.
+
+Keys are written as their names, see `key.by_name`, prefixed by any of
+`ctrl+`, `shift+` and `alt+`, chords as keys separated by spaces.
+
+defines the following:
+    pack_key    -- pack a key into an int.
+    parse       -- parse a key or chord into a tuple of packed keys.
+    Keymap      -- a set of key bindings.
+    KeymapStack -- a stack of keymaps dispatching keys.
+"""
+
+from contextlib import contextmanager
+from typing import Tuple, Union
+
+from .key import Key, KeyCode, KeyMod, by_name
+
+# the bits used by `KeyMod` flags in a packed key
+_MOD_BITS = 3
+
+_MODS = {
+    'ctrl': KeyMod.CTRL,
+    'shift': KeyMod.SHIFT,
+    'alt': KeyMod.ALT,
+}
+
+
+def pack_key(key: Union[Key, KeyCode]) -> int:
+    """Pack a key, or a key code with no modifiers, into an int.
+
+    >>> pack_key(Key(KeyCode.S, KeyMod.CTRL)) == parse('ctrl+s')[0]
+    True
+    """
+    if isinstance(key, tuple):
+        return key[0] << _MOD_BITS | key[1]
+    return key << _MOD_BITS
+
+
+def _parse_key(name: str) -> int:
+    *mods, name = name.lower().split('+')
+    mod = KeyMod.NO_MOD
+    for mod_name in mods:
+        try:
+            mod |= _MODS[mod_name]
+        except KeyError:
+            raise ValueError('unknown modifier: {!r}'.format(mod_name)) \
+                from None
+    try:
+        code = by_name[name]
+    except KeyError:
+        raise ValueError('unknown key: {!r}'.format(name)) from None
+    return code << _MOD_BITS | mod
+
+
+def parse(keys) -> Tuple[int, ...]:
+    """Parse a key or chord into a tuple of packed keys. A chord is either
+    a string of keys separated by spaces, or a sequence of key names, keys
+    and key codes.
+
+    >>> ctrl_s = Key(KeyCode.S, KeyMod.CTRL)
+    >>> parse('ctrl+x ctrl+s') == parse(['ctrl+x', ctrl_s])
+    True
+    >>> parse('shift+.') == (pack_key(Key(KeyCode.PERIOD, KeyMod.SHIFT)),)
+    True
+    """
+    if isinstance(keys, str):
+        keys = keys.split()
+    elif isinstance(keys, (KeyCode, Key)):
+        keys = [keys]
+    packed = tuple(_parse_key(key) if isinstance(key, str) else pack_key(key)
+                   for key in keys)
+    if not packed:
+        raise ValueError('no keys')
+    return packed
+
+
+class _Prefix(dict):
+    # a trie node, maps packed keys to actions or to nodes of longer chords.
+    __slots__ = ()
+
+
+def _insert(node: _Prefix, keys: Tuple[int, ...], action):
+    for key in keys[:-1]:
+        child = node.get(key)
+        if child is None:
+            child = node[key] = _Prefix()
+        elif not isinstance(child, _Prefix):
+            raise ValueError('key bound to an action and a chord')
+        node = child
+    if isinstance(node.get(keys[-1]), _Prefix):
+        raise ValueError('key bound to an action and a chord')
+    node[keys[-1]] = action
+
+
+def _merge(into: _Prefix, node: _Prefix):
+    # merge the bindings of `node` over those of `into`.
+    for key, value in node.items():
+        current = into.get(key)
+        if isinstance(value, _Prefix):
+            if not isinstance(current, _Prefix):
+                current = into[key] = _Prefix()
+            _merge(current, value)
+        else:
+            into[key] = value
+
+
+class Keymap:
+    """A set of key bindings, mapping keys and chords to actions.
+    Actions can be anything but None, usually callables or command names.
+
+    properties:
+        modal   -- if true, the keymaps beneath this one in a stack are
+                   disabled while it's on the stack.
+        version -- incremented whenever the bindings change.
+
+    A key can't be both bound and the start of a chord in the same keymap,
+    so bindings are dispatched as soon as their last key is pressed.
+
+    >>> keymap = Keymap({'q': 'quit', 'ctrl+x ctrl+s': 'save'})
+    >>> keymap.lookup('ctrl+x ctrl+s')
+    'save'
+    >>> len(keymap)
+    2
+    """
+
+    def __init__(self, bindings: dict = None, modal: bool = False):
+        self.modal = modal
+        self.version = 0
+        self._trie = _Prefix()
+        self._bindings = {}
+        for keys, action in (bindings or {}).items():
+            self.bind(keys, action)
+
+    def bind(self, keys, action):
+        """Bind a key or chord to an action, replacing the previous one."""
+        if action is None:
+            raise ValueError('action is None')
+        keys = parse(keys)
+        _insert(self._trie, keys, action)
+        self._bindings[keys] = action
+        self.version += 1
+        return self
+
+    def unbind(self, keys):
+        """Remove the binding of a key or chord."""
+        keys = parse(keys)
+        del self._bindings[keys]
+        self._trie = _Prefix()
+        for bound, action in self._bindings.items():
+            _insert(self._trie, bound, action)
+        self.version += 1
+        return self
+
+    def lookup(self, keys):
+        """Return the action bound to a key or chord, None if not bound."""
+        return self._bindings.get(parse(keys))
+
+    def __len__(self) -> int:
+        return len(self._bindings)
+
+    def __repr__(self):
+        return 'Keymap(bindings={}, modal={})'.format(len(self._bindings),
+                                                      self.modal)
+
+
+class KeymapStack:
+    """A stack of keymaps dispatching the pressed keys to their actions.
+
+    Keymaps higher in the stack override the bindings of those beneath,
+    a modal keymap disables all the keymaps beneath it.
+
+    properties:
+        pending -- the packed keys of the chord being typed.
+
+    >>> game = Keymap({'q': 'quit', 'i': 'inventory', 'g g': 'top'})
+    >>> stack = KeymapStack(game)
+    >>> stack.feed(Key(KeyCode.G, KeyMod.NO_MOD)), stack.feed(KeyCode.G)
+    (None, 'top')
+    >>> with stack.context(Keymap({'escape': 'close'}, modal=True)):
+    ...     stack.feed(KeyCode.ESCAPE), stack.feed(KeyCode.Q)
+    ('close', None)
+    >>> stack.feed(KeyCode.Q)
+    'quit'
+    >>> _ = stack.push(Keymap({'escape': 'close_help'}, modal=True))
+    >>> stack.feed(KeyCode.ESCAPE)
+    'close_help'
+    """
+
+    def __init__(self, *keymaps: Keymap):
+        self._keymaps = list(keymaps)
+        self._trie = None
+        # every keymap and its version when the trie was merged, keeping
+        # the keymaps so a new keymap can't be mistaken for a dropped one.
+        self._versions = None
+        self._node = None
+        self.pending = ()
+
+    @property
+    def keymaps(self) -> Tuple[Keymap, ...]:
+        """The keymaps of the stack, the top last."""
+        return tuple(self._keymaps)
+
+    def push(self, keymap: Keymap):
+        """Push a keymap on the stack, dropping any pending chord."""
+        self._keymaps.append(keymap)
+        self.reset()
+        return self
+
+    def pop(self) -> Keymap:
+        """Pop the top keymap, dropping any pending chord."""
+        keymap = self._keymaps.pop()
+        self.reset()
+        return keymap
+
+    @contextmanager
+    def context(self, keymap: Keymap):
+        """Push a keymap for the duration of the `with` block."""
+        self.push(keymap)
+        try:
+            yield keymap
+        finally:
+            self._keymaps.remove(keymap)
+            self.reset()
+
+    def reset(self):
+        """Drop the pending chord."""
+        self._node = None
+        self.pending = ()
+        return self
+
+    def _merged(self) -> _Prefix:
+        versions = [(keymap, keymap.version) for keymap in self._keymaps]
+        if versions != self._versions:
+            self._versions = versions
+            start = 0
+            for index, keymap in enumerate(self._keymaps):
+                if keymap.modal:
+                    start = index
+            self._trie = _Prefix()
+            for keymap in self._keymaps[start:]:
+                _merge(self._trie, keymap._trie)
+            self._node = None
+            self.pending = ()
+        return self._trie
+
+    def feed(self, key: Union[Key, KeyCode]):
+        """Dispatch a pressed key, return the action of the binding it
+        completes, or None.
+
+        A key continuing no chord drops the pending chord, and is then
+        dispatched on its own.
+        """
+        trie = self._merged()
+        packed = pack_key(key)
+        if self._node is not None:
+            value = self._node.get(packed)
+            if value is None:
+                self.reset()
+                value = trie.get(packed)
+        else:
+            value = trie.get(packed)
+        if value is None:
+            return None
+        if isinstance(value, _Prefix):
+            self._node = value
+            self.pending += (packed,)
+            return None
+        self.reset()
+        return value
+
+    def dispatch(self, key: Union[Key, KeyCode], *args, **kwargs):
+        """Feed a key, calling the action of the completed binding with the
+        given arguments. Return the result of the action, or None.
+        """
+        action = self.feed(key)
+        if action is None:
+            return None
+        return action(*args, **kwargs)
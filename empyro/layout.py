@@ -0,0 +1,197 @@
+"""Text layout: word wrapping, alignment and truncation into rectangles.
+
+Layouts are cached by their text, width and style, so laying out the same
+text every frame costs a dict lookup. Message logs wrap each message once
+when it's appended, so keeping a log costs only the new lines.
+
+Laid out text is drawn a line at a time, each line padded to the width of
+the rectangle and written as a single span.
+
+defines the following:
+    wrap       -- wrap text to a width.
+    layout     -- lay out text into lines of a given width and alignment.
+    draw_text  -- draw text laid out into a rectangle of a terminal.
+    MessageLog -- a log of wrapped messages, drawn most recent last.
+"""
+
+from collections import deque
+from functools import lru_cache
+from typing import Text, Tuple
+
+from .color import Color
+from .coord import Rect
+from .terminal import Terminal
+
+LEFT = 'left'
+CENTER = 'center'
+RIGHT = 'right'
+
+ELLIPSIS = '\u00bb'
+
+
+@lru_cache(maxsize=4096)
+def wrap(text: Text, width: int) -> Tuple[Text, ...]:
+    """Wrap text to lines of at most `width` characters, breaking lines at
+    spaces and newlines. Words longer than the width are broken.
+
+    >>> wrap('the quick brown fox', 10)
+    ('the quick', 'brown fox')
+    >>> wrap('abcdefgh ij\\n\\nk', 3)
+    ('abc', 'def', 'gh', 'ij', '', 'k')
+    """
+    if width < 1:
+        raise ValueError('width must be positive')
+    lines = []
+    for paragraph in text.split('\n'):
+        line = ''
+        for word in paragraph.split():
+            while len(word) > width:
+                if line:
+                    lines.append(line)
+                    line = ''
+                lines.append(word[:width])
+                word = word[width:]
+            if not line:
+                line = word
+            elif len(line) + 1 + len(word) <= width:
+                line += ' ' + word
+            else:
+                lines.append(line)
+                line = word
+        lines.append(line)
+    return tuple(lines)
+
+
+@lru_cache(maxsize=4096)
+def layout(text: Text, width: int,
+           align: Text = LEFT) -> Tuple[Tuple[int, Text], ...]:
+    """Lay out text into lines of the given width, return a tuple of
+    (offset, line) where offset is the start of the line for the alignment.
+
+    >>> layout('ab cd', 4, CENTER)
+    ((1, 'ab'), (1, 'cd'))
+    """
+    if align not in (LEFT, CENTER, RIGHT):
+        raise ValueError('unknown alignment: {!r}'.format(align))
+    return tuple(
+        (_offset(len(line), width, align), line) for line in wrap(text, width))
+
+
+def _offset(length: int, width: int, align: Text) -> int:
+    if align == CENTER:
+        return (width - length) // 2
+    if align == RIGHT:
+        return width - length
+    return 0
+
+
+def _truncate(line: Text, width: int) -> Text:
+    # shorten a line so an ellipsis fits at its end.
+    line = line[:width - 1].rstrip()
+    return line + ELLIPSIS
+
+
+def _padded(offset: int, line: Text, width: int) -> Text:
+    return ''.join((' ' * offset, line, ' ' * (width - offset - len(line))))
+
+
+def draw_text(terminal: Terminal, text: Text, window: Rect,
+              fg_color: Color = None, bg_color: Color = None,
+              align: Text = LEFT, ellipsis: bool = True) -> int:
+    """Draw text laid out into a window of the terminal, clearing the rest
+    of the window. Lines that don't fit are cut, ending the last line with
+    an ellipsis if `ellipsis` is true.
+
+    Return the number of lines the text takes, including those cut.
+    """
+    if window not in terminal.size:
+        raise ValueError('window out of bounds')
+    x, y, width, height = window
+    lines = layout(text, width, align)
+    shown = list(lines[:height])
+    if len(lines) > height and ellipsis and shown:
+        line = _truncate(shown[-1][1], width)
+        shown[-1] = (_offset(len(line), width, align), line)
+    shown.extend((0, '') for _ in range(height - len(shown)))
+    for row, (offset, line) in enumerate(shown):
+        terminal.write(_padded(offset, line, width), (x, y + row),
+                       fg_color, bg_color)
+    return len(lines)
+
+
+class MessageLog:
+    """A log of messages wrapped to a width.
+
+    Messages are wrapped once when appended, drawing shows the most
+    recent lines.
+
+    properties:
+        width     -- the width the messages are wrapped to.
+        max_lines -- the most lines kept, None for no limit.
+
+    >>> log = MessageLog(8)
+    >>> log.append('you hit the rat').append('the rat dies')
+    MessageLog(width=8, lines=4)
+    >>> log.lines[-2:]
+    ('the rat', 'dies')
+    """
+
+    def __init__(self, width: int, max_lines: int = 1000):
+        self.max_lines = max_lines
+        self._messages = deque(maxlen=max_lines)
+        self._lines = deque(maxlen=max_lines)
+        self._width = width
+
+    @property
+    def width(self) -> int:
+        return self._width
+
+    @width.setter
+    def width(self, width: int):
+        # the only case where all the messages are wrapped again.
+        self._width = width
+        self._lines.clear()
+        for message in self._messages:
+            self._lines.extend(wrap(message, width))
+
+    @property
+    def lines(self) -> Tuple[Text, ...]:
+        """The wrapped lines of the log."""
+        return tuple(self._lines)
+
+    def append(self, message: Text):
+        """Add a message to the log, wrapping only the message."""
+        self._messages.append(message)
+        self._lines.extend(wrap(message, self._width))
+        return self
+
+    def clear(self):
+        self._messages.clear()
+        self._lines.clear()
+        return self
+
+    def draw(self, terminal: Terminal, window: Rect,
+             fg_color: Color = None, bg_color: Color = None):
+        """Draw the most recent lines fitting in the window, with the most
+        recent line at the bottom. The log width must fit the window.
+        """
+        if window not in terminal.size:
+            raise ValueError('window out of bounds')
+        x, y, width, height = window
+        if self._width > width:
+            raise ValueError('log is wider than the window')
+        count = min(height, len(self._lines))
+        start = len(self._lines) - count
+        for row in range(height):
+            index = start + row - (height - count)
+            line = self._lines[index] if index >= start else ''
+            terminal.write(_padded(0, line, width), (x, y + row),
+                           fg_color, bg_color)
+        return self
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def __repr__(self):
+        return 'MessageLog(width={}, lines={})'.format(self._width,
+                                                       len(self._lines))
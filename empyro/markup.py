@@ -0,0 +1,114 @@
+"""Inline color markup for text written to terminals.
+
+Markup tags change the colors of the text following them, until closed:
+    {red}            -- foreground color.
+    {red on blue}    -- foreground and background colors.
+    {on blue}        -- background color only.
+    {#ff8000}        -- colors can be given in hex.
+    {/}              -- close the last opened tag.
+    {{ and }}        -- literal braces.
+
+Color names are the names of the constants in `empyro.color`, in any case.
+
+Parsed markup is cached by its text, and so are the glyphs built from it,
+so writing the same markup every frame skips parsing and building glyphs.
+
+defines the following:
+    parse   -- parse markup into a tuple of (text, fg, bg) runs.
+    glyphs  -- build the glyphs of markup text, given the default colors.
+"""
+
+import re
+from functools import lru_cache
+from typing import Text, Tuple, Union
+
+from . import color
+from .color import Color
+from .glyph import Glyph
+
+_TOKEN = re.compile(r'\{\{|\}\}|\{([^{}]*)\}')
+
+_COLORS = {
+    name.lower(): value for name, value in vars(color).items()
+    if isinstance(value, Color)
+}
+
+
+def _parse_color(name: Text) -> Color:
+    name = name.strip()
+    if name.startswith('#') and len(name) == 7:
+        try:
+            return Color(*bytes.fromhex(name[1:]))
+        except ValueError:
+            pass
+    try:
+        return _COLORS[name]
+    except KeyError:
+        raise ValueError('unknown color: {!r}'.format(name)) from None
+
+
+@lru_cache(maxsize=1024)
+def parse(text: Text) -> Tuple[Tuple[Text, Color, Color], ...]:
+    """Parse markup text into a tuple of (text, fg, bg) runs. Colors are
+    None where the text uses the default colors.
+
+    >>> parse('{red}HP{/} 10')
+    (('HP', Color(r=128, g=0, b=0), None), (' 10', None, None))
+    >>> parse('{{{on #000010}x}}{/}')
+    (('{', None, None), ('x}', None, Color(r=0, g=0, b=16)))
+    """
+    runs = []
+    # stack of (fg, bg), the top being the current colors
+    stack = [(None, None)]
+    pending = []
+    end = 0
+
+    def flush():
+        run = ''.join(pending)
+        pending.clear()
+        if run:
+            runs.append((run,) + stack[-1])
+
+    for match in _TOKEN.finditer(text):
+        pending.append(text[end:match.start()])
+        end = match.end()
+        token = match.group()
+        if token in ('{{', '}}'):
+            pending.append(token[0])
+            continue
+        tag = match.group(1).strip().lower()
+        flush()
+        if tag == '/':
+            if len(stack) == 1:
+                raise ValueError('closing tag without an opened tag')
+            stack.pop()
+            continue
+        fg, bg = stack[-1]
+        if tag.startswith('on '):
+            fg_name, bg_name = '', tag[3:]
+        else:
+            fg_name, _, bg_name = tag.partition(' on ')
+        if fg_name.strip():
+            fg = _parse_color(fg_name)
+        if bg_name.strip():
+            bg = _parse_color(bg_name)
+        stack.append((fg, bg))
+    pending.append(text[end:])
+    flush()
+    return tuple(runs)
+
+
+@lru_cache(maxsize=1024)
+def glyphs(text: Text, fg_color: Union[Color, int],
+           bg_color: Union[Color, int]) -> Tuple[Glyph, ...]:
+    """Return the glyphs of markup text, using the given colors where the
+    text doesn't specify them.
+
+    >>> [g.fg_color for g in glyphs('a{red}b', color.WHITE, color.BLACK)]
+    [Color(r=192, g=192, b=192), Color(r=128, g=0, b=0)]
+    """
+    return tuple(
+        Glyph(char,
+              fg_color if fg is None else fg,
+              bg_color if bg is None else bg)
+        for run, fg, bg in parse(text) for char in run)
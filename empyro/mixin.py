@@ -9,14 +9,34 @@ update.
 Multiple writes that result in the same glyph that was in the cell from last
 update will have no effect, and will not be on the changed glyphs dict.
 
+Optionally, the terminal can be put in palette mode, where glyph colors are
+indices into a `color.Palette`. A reverse index from palette indices to the
+cells using them is maintained, so changing a palette entry only marks the
+cells using that entry for rendering.
+
+Backends able to move their rendered contents (e.g. a surface self-blit) can
+set `_scroll_by_blit` and apply the moves given by `consume_scrolls` before
+drawing the changed cells, making `Terminal.scroll` cost only the cells
+uncovered by the move.
+
+Cached views (see `CachedSubterminal`) are composited when consuming the
+changed cells, if their contents changed or if anything was drawn over them.
+Backends can override `_composite_view` to composite a view as a whole.
+Cached views are held weakly, and detached when closed or collected.
+
+The rendered cells can be exported to other processes through a memory
+mapped file, see `DrawMixin.export_frames` and `empyro.framebuffer`.
+
 This module defines:
     DrawMixin -- a mix-in class for RenderableTerminal subclasses.
 """
 
-from typing import Iterator, Tuple
+import weakref
+from typing import Iterator, Tuple, Iterable, Union, Sequence, Text
 
 from . import glyph
 from .glyph import Glyph
+from .color import Color, Palette
 from .coord import Point, Size, Rect
 
 
@@ -30,15 +50,104 @@ class DrawMixin:
     The mix-in provides an implementation for the `draw_glyph` abstract method,
     and a generator `consume_changed_cells` for getting the changed cells to
     help implementing `render` abstract method.
+
+    In palette mode, the glyphs yielded by `consume_changed_cells` have
+    their palette indices resolved to colors.
     """
 
+    # set by backends that apply the moves from `consume_scrolls` themselves.
+    _scroll_by_blit = False
+
     def __init__(self, size: Size = None):
         super().__init__(size)
         self._cells = [
-            [glyph.CLEAR for y in range(self.size.height)]
-            for x in range(self.size.width)
+            [glyph.CLEAR] * self.size.height for x in range(self.size.width)
         ]
         self._changed_cells = {}
+        self._palette = None
+        # palette index -> set of the cells using it.
+        self._palette_users = {}
+        # cells that didn't change but have to be rendered again, such as
+        # those whose palette entries changed.
+        self._stale_cells = set()
+        # scrolls not yet applied by the backend.
+        self._scrolls = []
+        # cached view -> None, weakly, in the order they were attached so
+        # overlapping views composite in the same order every frame.
+        self._cached_views = weakref.WeakKeyDictionary()
+        # row -> (start x, end x, weak reference) of the cached views over
+        # the row, so draws mark the views beneath them as damaged.
+        self._view_rows = {}
+        # whether the cached views are being composited.
+        self._compositing = False
+        self._frame_buffer = None
+        # cells committed outside of `consume_changed_cells`, such as by a
+        # scroll, to be exported with the next frame.
+        self._exported_cells = set()
+
+    @property
+    def palette(self) -> Palette:
+        """The palette used by the terminal, or None if not in palette mode.
+        """
+        return self._palette
+
+    def set_palette(self, palette: Union[Palette, Iterable[Color], None]):
+        """Put the terminal in palette mode using the given palette.
+
+        Passing None turns palette mode off, in which case glyphs must not
+        use palette indices. Drawing a glyph using an index outside of the
+        palette raises ValueError.
+
+        >>> from empyro.backends.memory import MemoryTerminal
+        >>> term = MemoryTerminal((4, 1)).set_palette([(0, 0, 0)])
+        >>> term.draw_glyph(Glyph('a', 1), (0, 0))
+        Traceback (most recent call last):
+            ...
+        ValueError: palette index out of range
+        """
+        if palette is not None and not isinstance(palette, Palette):
+            palette = Palette(palette)
+        self._palette = palette
+        self._palette_users = {}
+        self._stale_cells.clear()
+        if palette is None:
+            return self
+        for x, column in enumerate(self._cells):
+            for y, glyph_ in enumerate(column):
+                self._index_cell(Point(x, y), glyph.CLEAR, glyph_)
+        for users in self._palette_users.values():
+            self._stale_cells.update(users)
+        for view in list(self._cached_views):
+            view.invalidate()
+        return self
+
+    def set_palette_entry(self, index: int, color_: Color):
+        """Change a palette entry, recoloring the cells that use it.
+
+        Only the cells using the entry are redrawn on the next render.
+
+        >>> from empyro.terminal import RenderableTerminal
+        >>> class Term(DrawMixin, RenderableTerminal):
+        ...     def render(self): return list(self.consume_changed_cells())
+        ...     def get_key(self): pass
+        >>> term = Term((4, 2)).set_palette([(0, 0, 0), (9, 9, 9)])
+        >>> _ = term.write('ab', (0, 0), 1, 0).render()
+        >>> cells = sorted(term.set_palette_entry(1, (7, 7, 7)).render())
+        >>> [at for at, _ in cells]
+        [Point(x=0, y=0), Point(x=1, y=0)]
+        >>> cells[0][1].fg_color
+        Color(r=7, g=7, b=7)
+        >>> term.render()
+        []
+        """
+        if self._palette is None:
+            raise ValueError('terminal is not in palette mode')
+        self._palette[index] = color_
+        users = self._palette_users.get(index, ())
+        self._stale_cells.update(users)
+        if self._view_rows:
+            self._invalidate_views(users)
+        return self
 
     def consume_changed_cells(self) -> Iterator[Tuple[Point, Glyph]]:
         """Generator to consume the modified cells.
@@ -46,15 +155,368 @@ class DrawMixin:
 
         Yield a tuple of the changed cell position and the new glyph.
         """
-        for at, glyph_ in self._changed_cells.items():
-            yield at, glyph_
-            self._cells[at[0]][at[1]] = glyph_
+        if self._cached_views:
+            self._composite_cached_views()
+        if self._palette is None:
+            for at, glyph_ in self._changed_cells.items():
+                yield at, glyph_
+                self._cells[at[0]][at[1]] = glyph_
+            for at in self._stale_cells:
+                if at not in self._changed_cells:
+                    yield at, self._cells[at[0]][at[1]]
+        else:
+            for at, glyph_ in self._changed_cells.items():
+                yield at, self._resolve(glyph_)
+                self._index_cell(at, self._cells[at[0]][at[1]], glyph_)
+                self._cells[at[0]][at[1]] = glyph_
+            for at in self._stale_cells:
+                if at not in self._changed_cells:
+                    yield at, self._resolve(self._cells[at[0]][at[1]])
+        if self._frame_buffer is not None:
+            self._exported_cells.update(self._changed_cells)
+            self._exported_cells.update(self._stale_cells)
+            self._export_frame(self._exported_cells)
+        self._stale_cells.clear()
         self._changed_cells.clear()
 
+    def export_frames(self, path: Text) -> 'FrameBuffer':
+        """Export the rendered cells to a memory mapped file at `path`,
+        written every time `consume_changed_cells` completes.
+        Return the `FrameBuffer`, closed by `stop_exporting_frames`.
+
+        >>> import os, tempfile
+        >>> from empyro.backends.memory import MemoryTerminal
+        >>> from empyro.framebuffer import FrameBufferReader
+        >>> path = os.path.join(tempfile.mkdtemp(), 'frame')
+        >>> term = MemoryTerminal((4, 2))
+        >>> _ = term.export_frames(path)
+        >>> reader = FrameBufferReader(path)
+        >>> _ = term.write('hi', (2, 1)).render()
+        >>> frame = reader.poll()
+        >>> chr(reader.code_at(frame, (3, 1))), reader.poll()
+        ('i', None)
+        >>> reader.close(); _ = term.stop_exporting_frames()
+        """
+        self.stop_exporting_frames()
+        from .framebuffer import FrameBuffer
+        self._frame_buffer = FrameBuffer(path, self.size.size)
+        self._export_all()
+        return self._frame_buffer
+
+    def stop_exporting_frames(self):
+        if self._frame_buffer is not None:
+            self._frame_buffer.close()
+            self._frame_buffer = None
+            self._exported_cells.clear()
+        return self
+
+    def _export_all(self):
+        self._exported_cells = {
+            Point(x, y)
+            for x in range(self.size.width) for y in range(self.size.height)
+        }
+        self._export_frame(self._exported_cells)
+
+    def _export_frame(self, cells: set):
+        # write the rendered glyphs of the cells as a frame.
+        rendered, pack = self._cells, glyph.pack
+        if self._palette is not None:
+            resolve = self._resolve
+            values = ((at, pack(resolve(rendered[at[0]][at[1]])))
+                      for at in cells)
+        else:
+            values = ((at, pack(rendered[at[0]][at[1]])) for at in cells)
+        with self._frame_buffer.frame():
+            if self._frame_buffer.size != self.size.size:
+                self._frame_buffer.resize(self.size.size)
+            self._frame_buffer.write(values)
+        cells.clear()
+
+    def resize(self, size: Size):
+        """Resize the terminal, keeping the contents of the cells still
+        inside it. The cells added by the resize are cleared, and rendered
+        on the next render.
+
+        Backends setting `_scroll_by_blit` should apply the pending scrolls
+        before resizing.
+
+        >>> from empyro.backends.memory import MemoryTerminal
+        >>> term = MemoryTerminal((4, 1))
+        >>> _ = term.write('abcd', (0, 0)).render()
+        >>> [at for at, _ in term.resize((2, 2)).render()]
+        [Point(x=0, y=1), Point(x=1, y=1)]
+        >>> term.glyph_at((1, 0)).code
+        <CharCode.B_LOWER: 98>
+        """
+        old_width, old_height = self.size.width, self.size.height
+        super().resize(size)
+        width, height = self.size.width, self.size.height
+        cells = self._cells
+        del cells[width:]
+        for column in cells:
+            del column[height:]
+            column.extend([glyph.CLEAR] * (height - old_height))
+        cells.extend([glyph.CLEAR] * height
+                     for _ in range(width - old_width))
+        bounds = self.size
+        self._changed_cells = {
+            at: glyph_ for at, glyph_ in self._changed_cells.items()
+            if at in bounds
+        }
+        self._stale_cells = {at for at in self._stale_cells if at in bounds}
+        self._stale_cells.update(
+            Point(x, y) for x in range(width) for y in range(height)
+            if x >= old_width or y >= old_height)
+        for index, users in self._palette_users.items():
+            self._palette_users[index] = {at for at in users if at in bounds}
+        self._index_cached_views()
+        for view in list(self._cached_views):
+            view._damaged = True
+        if self._frame_buffer is not None:
+            # the layout changes, export the whole frame
+            self._export_all()
+        return self
+
+    def consume_scrolls(self) -> Iterator[Tuple[Rect, int, int]]:
+        """Generator to consume the scrolls made since the last render.
+        Only used by backends setting `_scroll_by_blit`, which must apply
+        them, in order, before drawing the changed cells.
+
+        Yield a tuple of the scrolled window, dx and dy.
+        """
+        yield from self._scrolls
+        self._scrolls.clear()
+
+    def scroll(self, window: Rect, dx: int, dy: int):
+        if window not in self.size:
+            raise ValueError('window out of bounds')
+        window = Rect(*window)
+        # the part of the window that receives the moved contents
+        dest = Rect(window.x + max(0, dx), window.y + max(0, dy),
+                    window.width - abs(dx), window.height - abs(dy))
+        # nothing to do, or everything is moved out of the window
+        if dest.width <= 0 or dest.height <= 0 or not (dx or dy):
+            return self
+        if not self._scroll_by_blit:
+            # move the contents through the draw calls, cells that don't
+            # change are filtered out as usual.
+            moved = [
+                (self.glyph_at((x - dx, y - dy)), Point(x, y))
+                for y in range(dest.y, dest.y + dest.height)
+                for x in range(dest.x, dest.x + dest.width)
+            ]
+            for glyph_, at in moved:
+                self.draw_glyph(glyph_, at)
+            return self
+        # the backend moves the rendered cells, mirror that in the cells
+        # and move any pending changes along.
+        self._scrolls.append((window, dx, dy))
+        cells = self._cells
+        moved = [
+            (cells[x - dx][y - dy], Point(x, y))
+            for y in range(dest.y, dest.y + dest.height)
+            for x in range(dest.x, dest.x + dest.width)
+        ]
+        for glyph_, at in moved:
+            self._commit(at, glyph_)
+        for view in list(self._cached_views):
+            if _overlaps(view.view_window, window):
+                view._damaged = True
+        changed = {}
+        for at, glyph_ in self._changed_cells.items():
+            for to in _scrolled(at, window, dest, dx, dy):
+                changed[to] = glyph_
+        self._changed_cells = changed
+        self._stale_cells = {
+            to for at in self._stale_cells
+            for to in _scrolled(at, window, dest, dx, dy)
+        }
+        return self
+
+    def _check_palette(self, glyph_: Glyph):
+        # palette indices must be in the palette, checked for the glyphs
+        # changing a cell, as their colors are resolved when rendering.
+        size = 0 if self._palette is None else len(self._palette)
+        for index in (glyph_.fg_color, glyph_.bg_color):
+            if isinstance(index, int) and not 0 <= index < size:
+                raise ValueError('palette index out of range')
+
     def draw_glyph(self, glyph_: Glyph, at: Point):
         if at not in self.size:
             raise ValueError('draw out of bounds')
         if self._cells[at[0]][at[1]] == glyph_:
             self._changed_cells.pop(at, None)
         else:
+            if (glyph_[1].__class__ is not Color or
+                    glyph_[2].__class__ is not Color):
+                self._check_palette(glyph_)
             self._changed_cells[at] = glyph_
+            if self._view_rows:
+                self._damage_views(at[1], at[0], at[0] + 1)
+
+    def draw_span(self, glyphs: Sequence[Glyph], at: Point):
+        if not glyphs:
+            return
+        if at not in self.size or at[0] + len(glyphs) > self.size.width:
+            raise ValueError('draw out of bounds')
+        self._draw_span_unchecked(glyphs, at)
+
+    def _draw_span_unchecked(self, glyphs: Sequence[Glyph], at: Point):
+        cells, changed = self._cells, self._changed_cells
+        y = at[1]
+        check_palette = self._check_palette
+        dirty = False
+        for x, glyph_ in enumerate(glyphs, at[0]):
+            if cells[x][y] == glyph_:
+                changed.pop(Point(x, y), None)
+            else:
+                # colors are exactly `Color` unless they're palette indices
+                if (glyph_[1].__class__ is not Color or
+                        glyph_[2].__class__ is not Color):
+                    check_palette(glyph_)
+                changed[Point(x, y)] = glyph_
+                dirty = True
+        if dirty and self._view_rows:
+            self._damage_views(y, at[0], at[0] + len(glyphs))
+
+    def draw_column(self, glyphs: Sequence[Glyph], at: Point):
+        if not glyphs:
+            return
+        if at not in self.size or at[1] + len(glyphs) > self.size.height:
+            raise ValueError('draw out of bounds')
+        x = at[0]
+        column, changed = self._cells[x], self._changed_cells
+        check_palette = self._check_palette
+        damage = self._damage_views if self._view_rows else None
+        for y, glyph_ in enumerate(glyphs, at[1]):
+            if column[y] == glyph_:
+                changed.pop(Point(x, y), None)
+            else:
+                # colors are exactly `Color` unless they're palette indices
+                if (glyph_[1].__class__ is not Color or
+                        glyph_[2].__class__ is not Color):
+                    check_palette(glyph_)
+                changed[Point(x, y)] = glyph_
+                if damage is not None:
+                    damage(y, x, x + 1)
+
+    def _resolve(self, glyph_: Glyph) -> Glyph:
+        # replace the palette indices of a glyph with their colors.
+        fg, bg = glyph_.fg_color, glyph_.bg_color
+        if not isinstance(fg, int) and not isinstance(bg, int):
+            return glyph_
+        palette = self._palette
+        return Glyph(glyph_.code,
+                     palette[fg] if isinstance(fg, int) else fg,
+                     palette[bg] if isinstance(bg, int) else bg)
+
+    def _index_cell(self, at: Point, old: Glyph, new: Glyph):
+        # update the reverse palette index for a cell changing its glyph.
+        users = self._palette_users
+        for index in (old.fg_color, old.bg_color):
+            if isinstance(index, int):
+                users[index].discard(at)
+        for index in (new.fg_color, new.bg_color):
+            if isinstance(index, int):
+                users.setdefault(index, set()).add(at)
+
+    def _attach_cached_view(self, view):
+        # called by cached views on creation.
+        self._cached_views[view] = None
+        self._index_cached_views()
+
+    def _detach_cached_view(self, view):
+        # called by cached views when closed, the cells beneath keep the
+        # contents of the view until drawn over.
+        self._cached_views.pop(view, None)
+        self._index_cached_views()
+
+    def _index_cached_views(self):
+        # index the cached views by row, after they're attached, detached
+        # or moved. Collected views are skipped until the next index.
+        rows = {}
+        for view in self._cached_views:
+            x, y, width, height = view.view_window
+            entry = (x, x + width, weakref.ref(view))
+            for row in range(y, y + height):
+                rows.setdefault(row, []).append(entry)
+        self._view_rows = rows
+
+    def _views_over(self, y: int, start: int, end: int):
+        # the cached views over the cells from start to end of a row.
+        for x0, x1, ref in self._view_rows.get(y, ()):
+            if x0 < end and start < x1:
+                view = ref()
+                if view is not None:
+                    yield view
+
+    def _damage_views(self, y: int, start: int, end: int):
+        # cells were drawn beneath the views, composite them again. The
+        # draws of the composited views themselves don't damage others.
+        if self._compositing:
+            return
+        for view in self._views_over(y, start, end):
+            view._damaged = True
+
+    def _invalidate_views(self, cells: Iterable[Point]):
+        # palette entries used by the views changed, raster them again.
+        views = set()
+        for at in cells:
+            views.update(self._views_over(at[1], at[0], at[0] + 1))
+        for view in views:
+            view.invalidate()
+
+    def _composite_cached_views(self):
+        damaged = [view for view in self._cached_views if view._damaged]
+        self._compositing = True
+        try:
+            for view in damaged:
+                view._damaged = False
+                self._composite_view(view)
+        finally:
+            self._compositing = False
+
+    def _composite_view(self, view):
+        """Draw the contents of a cached view over the cells beneath it.
+        Backends can override it to composite the view as a whole, after
+        committing its contents with `_commit` and discarding the pending
+        changes beneath it.
+        """
+        for at, glyph_ in view.cells():
+            self.draw_glyph(glyph_, at)
+
+    def _commit(self, at: Point, glyph_: Glyph):
+        # set the glyph of a cell as the rendered one.
+        if self._palette is not None:
+            self._index_cell(at, self._cells[at[0]][at[1]], glyph_)
+        self._cells[at[0]][at[1]] = glyph_
+        if self._frame_buffer is not None:
+            self._exported_cells.add(at)
+
+    def glyph_at(self, at: Point) -> Glyph:
+        """Return the glyph at the specified position, including the
+        changes not yet rendered.
+        """
+        if at not in self.size:
+            raise ValueError('position out of bounds')
+        try:
+            return self._changed_cells[at]
+        except KeyError:
+            return self._cells[at[0]][at[1]]
+
+
+def _overlaps(a: Rect, b: Rect) -> bool:
+    return (a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and
+            a[1] < b[1] + b[3] and b[1] < a[1] + a[3])
+
+
+def _scrolled(at: Point, window: Rect, dest: Rect, dx: int, dy: int):
+    # the positions a cell's contents are at after scrolling the window.
+    if at not in window:
+        return (at,)
+    to = Point(at[0] + dx, at[1] + dy)
+    positions = (to,) if to in dest else ()
+    # uncovered cells keep their old contents
+    if at not in dest:
+        positions += (Point(*at),)
+    return positions
@@ -0,0 +1,184 @@
+"""Record the keys read from a terminal, and replay them later.
+
+A recorder wraps the `get_key` method of a terminal instance, timestamping
+every key read. A replay replaces it with one returning the recorded keys,
+waiting until their recorded time, scaled by a speed, or not at all, so
+the same session can be rerun offline and its frame times compared
+between versions, see `empyro.stats`.
+
+Recordings are saved as JSON lines of `[time, code, mod]`.
+
+defines the following:
+    Recording -- timestamped keys.
+    Recorder  -- records the keys read from a terminal.
+    Replay    -- replays a recording through a terminal's `get_key`.
+"""
+
+import json
+import time
+from typing import Iterator, List, Tuple
+
+from .key import Key, KeyCode, KeyMod
+
+
+class Recording:
+    """A list of keys and the time they were read, in seconds from the
+    start of the recording.
+
+    >>> recording = Recording([(0.5, Key(KeyCode.Q, KeyMod.CTRL))])
+    >>> Recording.loads(recording.dumps()) == recording
+    True
+    """
+
+    def __init__(self, keys: List[Tuple[float, Key]] = None):
+        self.keys = [] if keys is None else keys
+
+    @property
+    def duration(self) -> float:
+        return self.keys[-1][0] if self.keys else 0.0
+
+    def dumps(self) -> str:
+        return ''.join(json.dumps([at, int(key[0]), int(key[1])]) + '\n'
+                       for at, key in self.keys)
+
+    @classmethod
+    def loads(cls, text: str) -> 'Recording':
+        keys = []
+        for line in text.splitlines():
+            if line.strip():
+                at, code, mod = json.loads(line)
+                keys.append((at, Key(KeyCode(code), KeyMod(mod))))
+        return cls(keys)
+
+    def save(self, path: str):
+        with open(path, 'w') as file:
+            file.write(self.dumps())
+        return self
+
+    @classmethod
+    def load(cls, path: str) -> 'Recording':
+        with open(path) as file:
+            return cls.loads(file.read())
+
+    def __iter__(self) -> Iterator[Tuple[float, Key]]:
+        return iter(self.keys)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Recording):
+            return NotImplemented
+        return self.keys == other.keys
+
+
+class Recorder:
+    """Records the keys read from a terminal through `get_key`,
+    and so through `Terminal.read`.
+
+    properties:
+        terminal  -- the recorded terminal.
+        recording -- the `Recording` of the keys read.
+
+    >>> from empyro.backends.memory import MemoryTerminal
+    >>> term = MemoryTerminal((10, 2))
+    >>> recorder = Recorder(term).start()
+    >>> _ = term.feed_key(Key(KeyCode.A, KeyMod.NO_MOD))
+    >>> term.read().code, len(recorder.stop().recording)
+    (<KeyCode.A: 97>, 1)
+    """
+
+    def __init__(self, terminal, recording: Recording = None):
+        self.terminal = terminal
+        self.recording = Recording() if recording is None else recording
+        self._start = None
+        self._get_key = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._get_key is not None
+
+    def start(self):
+        """Install the recording `get_key` on the terminal."""
+        if self.enabled:
+            return self
+        original = self.terminal.get_key
+        self._start = time.perf_counter() - self.recording.duration
+
+        def get_key():
+            key = original()
+            if key is not None:
+                self.recording.keys.append(
+                    (time.perf_counter() - self._start, key))
+            return key
+        self.terminal.get_key = self._get_key = get_key
+        return self
+
+    def stop(self):
+        """Remove the recording `get_key` from the terminal."""
+        if vars(self.terminal).get('get_key') is self._get_key:
+            del self.terminal.get_key
+        self._get_key = None
+        return self
+
+
+class Replay:
+    """Replays a recording through the `get_key` of a terminal, so the keys
+    are read as if typed live.
+
+    properties:
+        terminal  -- the terminal replayed to.
+        recording -- the replayed `Recording`.
+        speed     -- the speed of the replay, 1 for the recorded speed,
+                     None for no waiting at all.
+
+    Once the keys are all read, `get_key` raises `EOFError`.
+
+    >>> from empyro.backends.memory import MemoryTerminal
+    >>> term = MemoryTerminal((10, 2))
+    >>> recording = Recording([(60.0, Key(KeyCode.Q, KeyMod.NO_MOD))])
+    >>> replay = Replay(term, recording, speed=None).start()
+    >>> term.read().code
+    <KeyCode.Q: 113>
+    >>> term.read()
+    Traceback (most recent call last):
+    ...
+    EOFError: replay finished
+    """
+
+    def __init__(self, terminal, recording: Recording, speed: float = 1.0):
+        self.terminal = terminal
+        self.recording = recording
+        self.speed = speed
+        self._next = 0
+        self._start = None
+
+    @property
+    def done(self) -> bool:
+        return self._next >= len(self.recording)
+
+    def start(self):
+        """Install the replaying `get_key` on the terminal, the recorded
+        times start from now.
+        """
+        self._next = 0
+        self._start = time.perf_counter()
+        self.terminal.get_key = self._get_key
+        return self
+
+    def stop(self):
+        """Remove the replaying `get_key` from the terminal."""
+        if vars(self.terminal).get('get_key') == self._get_key:
+            del self.terminal.get_key
+        return self
+
+    def _get_key(self) -> Key:
+        if self.done:
+            raise EOFError('replay finished')
+        at, key = self.recording.keys[self._next]
+        self._next += 1
+        if self.speed is not None:
+            delay = self._start + at / self.speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        return key
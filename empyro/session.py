@@ -0,0 +1,187 @@
+"""Host many terminal sessions in a single asyncio event loop.
+
+Each session pairs a terminal, usually a headless `MemoryTerminal`, with an
+update function drawing its frames. The host renders the sessions round
+robin, yielding to the event loop between sessions so their IO keeps
+flowing. A session whose frame takes longer than its frame budget skips
+the following frames in proportion, so a slow session can't starve the
+others.
+
+The sessions share the immutable resources, glyphs and their packed forms,
+so the memory of a session is mostly its cells, see `Session.memory`.
+
+defines the following:
+    Session     -- a terminal and its update function.
+    SessionHost -- renders sessions round robin.
+"""
+
+import asyncio
+import inspect
+import sys
+from time import perf_counter
+from typing import Callable
+
+from . import color
+from . import glyph
+from .charcode import CharCode
+from .terminal import RenderableTerminal
+
+# objects shared by all sessions, not counted in their memory.
+_SHARED_IDS = {
+    id(value) for value in (
+        [glyph.CLEAR] + list(glyph.CLEAR) + list(CharCode) +
+        [value for value in vars(color).values()
+         if isinstance(value, color.Color)])
+}
+
+
+def _sizeof(obj, seen: set) -> int:
+    # the size of an object and what it references, skipping shared objects.
+    if id(obj) in seen or id(obj) in _SHARED_IDS:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_sizeof(key, seen) + _sizeof(value, seen)
+                    for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_sizeof(item, seen) for item in obj)
+    return size
+
+
+class Session:
+    """A terminal and the function drawing its frames.
+
+    properties:
+        terminal     -- the session's terminal.
+        update       -- called with the session before rendering a frame,
+                        may return an awaitable.
+        send         -- if not None, called with the result of every render.
+        frame_budget -- the time in seconds a frame is allowed to take,
+                        None to use the host's.
+        frames       -- the number of frames rendered.
+        overruns     -- the number of frames that took longer than the
+                        budget.
+        frame_time   -- the time in seconds the last frame took.
+    """
+
+    def __init__(self, terminal: RenderableTerminal,
+                 update: Callable[['Session'], None],
+                 send: Callable = None, frame_budget: float = None):
+        self.terminal = terminal
+        self.update = update
+        self.send = send
+        self.frame_budget = frame_budget
+        self.frames = 0
+        self.overruns = 0
+        self.frame_time = 0.0
+        # frames left to skip after an overrun
+        self._skip = 0
+
+    def memory(self) -> int:
+        """Estimate the memory used by the session's terminal in bytes,
+        not counting the resources shared with other sessions.
+        """
+        seen = set()
+        return _sizeof(self.terminal, seen) + _sizeof(vars(self.terminal),
+                                                      seen)
+
+
+class SessionHost:
+    """Render many sessions round robin in a single event loop.
+
+    properties:
+        frame_budget -- the default frame budget of the sessions in seconds.
+        interval     -- the time between the start of two frames in seconds.
+        max_skip     -- the most frames a session can skip after an overrun.
+        sessions     -- the list of hosted sessions.
+
+    >>> from empyro.backends.memory import MemoryTerminal
+    >>> host = SessionHost()
+    >>> def update(session):
+    ...     session.terminal.write(str(session.frames), (0, 0))
+    >>> sent = []
+    >>> session = host.add(MemoryTerminal((10, 2)), update, sent.append)
+    >>> loop = asyncio.new_event_loop()
+    >>> loop.run_until_complete(host.run_frame())
+    >>> loop.run_until_complete(host.run_frame())
+    >>> loop.close()
+    >>> session.frames, [len(cells) for cells in sent]
+    (2, [1, 1])
+    >>> host.memory_report()[session] > 0
+    True
+    """
+
+    def __init__(self, frame_budget: float = 0.005, interval: float = 1 / 30,
+                 max_skip: int = 8):
+        self.frame_budget = frame_budget
+        self.interval = interval
+        self.max_skip = max_skip
+        self.sessions = []
+        self._next = 0
+        self._running = False
+
+    def add(self, terminal: RenderableTerminal,
+            update: Callable[[Session], None], send: Callable = None,
+            frame_budget: float = None) -> Session:
+        """Host a new session, and return it."""
+        session = Session(terminal, update, send, frame_budget)
+        self.sessions.append(session)
+        return session
+
+    def remove(self, session: Session):
+        """Stop hosting a session."""
+        self.sessions.remove(session)
+        return self
+
+    def memory_report(self) -> dict:
+        """Return a dict of the sessions and their memory in bytes."""
+        return {session: session.memory() for session in self.sessions}
+
+    async def _run_session(self, session: Session):
+        start = perf_counter()
+        result = session.update(session)
+        if inspect.isawaitable(result):
+            await result
+        rendered = session.terminal.render()
+        if session.send is not None:
+            session.send(rendered)
+        session.frame_time = perf_counter() - start
+        session.frames += 1
+        budget = (self.frame_budget if session.frame_budget is None
+                  else session.frame_budget)
+        if session.frame_time > budget:
+            session.overruns += 1
+            session._skip = min(self.max_skip,
+                                int(session.frame_time / budget))
+
+    async def run_frame(self):
+        """Render a frame of every session, skipping those paying back an
+        overrun. The session going first rotates every frame.
+        """
+        sessions = self.sessions
+        if not sessions:
+            return
+        start = self._next % len(sessions)
+        self._next = start + 1
+        for session in sessions[start:] + sessions[:start]:
+            if session._skip:
+                session._skip -= 1
+                continue
+            await self._run_session(session)
+            # let the other tasks, such as the sessions' IO, run
+            await asyncio.sleep(0)
+
+    async def run(self):
+        """Render frames every `interval` seconds until `stop` is called."""
+        loop = asyncio.get_running_loop()
+        self._running = True
+        while self._running:
+            start = loop.time()
+            await self.run_frame()
+            await asyncio.sleep(max(0.0, self.interval -
+                                    (loop.time() - start)))
+
+    def stop(self):
+        """Stop running after the current frame."""
+        self._running = False
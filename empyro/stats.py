@@ -0,0 +1,272 @@
+"""Instrumentation of terminals, for finding where frame time goes.
+
+Instrumenting a terminal replaces its drawing and rendering methods, on
+that instance only, with wrappers counting and timing the calls. Disabling
+it removes the wrappers, so terminals that are not instrumented pay nothing.
+
+After every render, the stats of the frame are passed to the sink, any
+callable taking a `FrameStats`, to ship them to a metrics system.
+
+defines the following:
+    FrameStats      -- the counts and times of a single frame.
+    Histogram       -- a histogram of durations, with power of 2 buckets.
+    Instrumentation -- instruments a terminal.
+    instrument      -- helper to create and enable an instrumentation.
+"""
+
+from time import perf_counter
+from typing import Callable, Iterator, Sequence
+
+from .glyph import Glyph
+from .coord import Point
+
+
+class FrameStats:
+    """The counts and times of a single frame.
+
+    properties:
+        draw_calls       -- the number of `draw_glyph` and `draw_span` calls.
+        redundant_writes -- the number of cells drawn with the glyph they
+                            already had.
+        dirty_cells      -- the number of cells consumed by the render.
+        blits            -- the number of blits a surface backend issues
+                            for the frame: one per dirty cell, scroll and
+                            composited cached view.
+        present_rects    -- the number of rects presented to the screen,
+                            if the render returns them.
+        draw_time        -- seconds spent drawing.
+        diff_time        -- seconds spent consuming the changed cells.
+        render_time      -- seconds spent rendering, including diff_time.
+    """
+
+    def __init__(self):
+        self.draw_calls = 0
+        self.redundant_writes = 0
+        self.dirty_cells = 0
+        self.blits = 0
+        self.present_rects = 0
+        self.draw_time = 0.0
+        self.diff_time = 0.0
+        self.render_time = 0.0
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+    def __repr__(self):
+        return 'FrameStats({})'.format(', '.join(
+            '{}={!r}'.format(name, value)
+            for name, value in vars(self).items()))
+
+
+class Histogram:
+    """A histogram of durations in power of 2 microsecond buckets.
+    Bucket i counts the durations less than 2**i microseconds, not counted
+    by the previous buckets.
+
+    >>> histogram = Histogram()
+    >>> for seconds in (0.0000005, 0.000003, 0.000003, 0.001):
+    ...     histogram.add(seconds)
+    >>> histogram.count
+    4
+    >>> histogram.buckets[:3]
+    [1, 0, 2]
+    >>> histogram.percentile(50)
+    4e-06
+    """
+
+    BUCKETS = 32
+
+    def __init__(self):
+        self.buckets = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds: float):
+        bucket = int(seconds * 1000000).bit_length()
+        self.buckets[min(bucket, self.BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """Return an upper bound, in seconds, of the given percentile."""
+        rank = self.count * percent / 100
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return (1 << bucket) / 1000000
+        return 0.0
+
+
+class Instrumentation:
+    """Counts and times the drawing and rendering of a terminal.
+
+    properties:
+        terminal   -- the instrumented terminal.
+        sink       -- called with the `FrameStats` of every rendered frame.
+        stats      -- the stats of the current frame.
+        last_frame -- the stats of the last rendered frame.
+        histograms -- a dict of `Histogram`s for 'draw' (per call),
+                      'diff' and 'render' (per frame), over all frames.
+
+    >>> from empyro.mixin import DrawMixin
+    >>> from empyro.terminal import RenderableTerminal
+    >>> class Term(DrawMixin, RenderableTerminal):
+    ...     def render(self): return list(self.consume_changed_cells())
+    ...     def get_key(self): pass
+    >>> term = Term((10, 2))
+    >>> frames = []
+    >>> instrumentation = instrument(term, frames.append)
+    >>> _ = term.write('ab', (0, 0)).write('a', (0, 0)).render()
+    >>> frames[0].draw_calls, frames[0].redundant_writes, frames[0].dirty_cells
+    (2, 1, 2)
+    >>> from empyro.canvas import Canvas
+    >>> canvas = Canvas((10, 2)).write('ab', (0, 0))
+    >>> stats = instrument(canvas).stats
+    >>> _ = canvas.write('ab', (0, 0))
+    >>> stats.draw_calls, stats.redundant_writes
+    (1, 2)
+    >>> _ = instrumentation.disable()
+    >>> 'draw_span' in vars(term)
+    False
+    """
+
+    # instrumented methods, wrapped if the terminal has them
+    _METHODS = ('draw_glyph', 'draw_span', '_draw_span_unchecked',
+                'draw_column',
+                'consume_changed_cells', 'consume_scrolls', '_composite_view',
+                'render')
+
+    def __init__(self, terminal, sink: Callable[[FrameStats], None] = None):
+        self.terminal = terminal
+        self.sink = sink
+        self.stats = FrameStats()
+        self.last_frame = None
+        self.histograms = {
+            'draw': Histogram(), 'diff': Histogram(), 'render': Histogram()
+        }
+        self._originals = {}
+        # whether an instrumented draw call is running.
+        self._drawing = False
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._originals)
+
+    def enable(self):
+        """Install the wrappers on the terminal."""
+        if self._originals:
+            return self
+        for name in self._METHODS:
+            original = getattr(self.terminal, name, None)
+            if original is not None:
+                self._originals[name] = original
+                setattr(self.terminal, name,
+                        getattr(self, '_wrap_' + name.lstrip('_'))(original))
+        return self
+
+    def disable(self):
+        """Remove the wrappers from the terminal."""
+        for name in self._originals:
+            delattr(self.terminal, name)
+        self._originals.clear()
+        return self
+
+    def _is_redundant(self, glyph_: Glyph, at: Point) -> bool:
+        glyph_at = getattr(self.terminal, 'glyph_at', None)
+        try:
+            return glyph_at is not None and glyph_at(at) == glyph_
+        except (ValueError, NotImplementedError):
+            return False
+
+    def _draw(self, original, glyphs: Sequence[Glyph], points, *args):
+        # count and time a draw call. Draws made by another draw, such as
+        # the `draw_glyph` calls of the default `Terminal.draw_span`, are
+        # part of the outer call and not counted again.
+        if self._drawing:
+            return original(*args)
+        stats = self.stats
+        stats.draw_calls += 1
+        for glyph_, at in zip(glyphs, points):
+            if self._is_redundant(glyph_, at):
+                stats.redundant_writes += 1
+        self._drawing = True
+        start = perf_counter()
+        try:
+            original(*args)
+        finally:
+            self._drawing = False
+            elapsed = perf_counter() - start
+            stats.draw_time += elapsed
+            self.histograms['draw'].add(elapsed)
+
+    def _wrap_draw_glyph(self, original):
+        def draw_glyph(glyph_: Glyph, at: Point):
+            self._draw(original, (glyph_,), (at,), glyph_, at)
+        return draw_glyph
+
+    def _wrap_draw_span(self, original):
+        def draw_span(glyphs: Sequence[Glyph], at: Point):
+            points = (Point(at[0] + offset, at[1])
+                      for offset in range(len(glyphs)))
+            self._draw(original, glyphs, points, glyphs, at)
+        return draw_span
+
+    _wrap_draw_span_unchecked = _wrap_draw_span
+
+    def _wrap_draw_column(self, original):
+        def draw_column(glyphs: Sequence[Glyph], at: Point):
+            points = (Point(at[0], at[1] + offset)
+                      for offset in range(len(glyphs)))
+            self._draw(original, glyphs, points, glyphs, at)
+        return draw_column
+
+    def _wrap_consume_changed_cells(self, original):
+        def consume_changed_cells() -> Iterator:
+            start = perf_counter()
+            for cell in original():
+                self.stats.dirty_cells += 1
+                self.stats.blits += 1
+                yield cell
+            elapsed = perf_counter() - start
+            self.stats.diff_time += elapsed
+            self.histograms['diff'].add(elapsed)
+        return consume_changed_cells
+
+    def _wrap_consume_scrolls(self, original):
+        def consume_scrolls() -> Iterator:
+            for scroll in original():
+                self.stats.blits += 1
+                yield scroll
+        return consume_scrolls
+
+    def _wrap_composite_view(self, original):
+        def composite_view(view):
+            self.stats.blits += 1
+            return original(view)
+        return composite_view
+
+    def _wrap_render(self, original):
+        def render():
+            start = perf_counter()
+            result = original()
+            elapsed = perf_counter() - start
+            stats = self.stats
+            stats.render_time += elapsed
+            self.histograms['render'].add(elapsed)
+            if isinstance(result, (list, tuple)):
+                stats.present_rects = len(result)
+            self.last_frame, self.stats = stats, FrameStats()
+            if self.sink is not None:
+                self.sink(stats)
+            return result
+        return render
+
+
+def instrument(terminal, sink: Callable[[FrameStats], None] = None):
+    """Instrument a terminal, return the enabled `Instrumentation`."""
+    return Instrumentation(terminal, sink).enable()
@@ -1,12 +1,16 @@
 """Provide the virtual terminal base class used for emulation.
 
 defines the following classes:
-    Terminal    -- base class for terminals.
-    Subterminal -- a subterminal of a parent/root terminal.
+    Terminal          -- base class for terminals.
+    Subterminal       -- a subterminal of a parent/root terminal.
+    CachedSubterminal -- a subterminal retaining its contents, composited
+                         onto the root terminal as a whole.
 """
 
+import weakref
 from abc import ABC, abstractmethod
-from typing import Union, Text, List
+from array import array
+from typing import Union, Text, List, Sequence
 
 from . import color
 from . import glyph
@@ -35,6 +39,8 @@ class Terminal(ABC):
         self.fg_color = color.WHITE
         size = (80, 24) if size is None else size
         self.size = Rect(0, 0, *size)
+        # views into the terminal, fitted to it when it's resized.
+        self._views = weakref.WeakSet()
 
     def color(self, fg: Color, bg: Color):
         """Set the default foreground and background colors."""
@@ -49,23 +55,31 @@ class Terminal(ABC):
         return self.get_key()
 
     def write(self, text: Union[Text, CharCode, List[CharCode]],
-                 at: Point, fg_color: Color = None, bg_color: Color = None):
+                 at: Point, fg_color: Color = None, bg_color: Color = None,
+                 markup: bool = False):
         """Write text at the specified position.
         A string or list of charcodes or a charcode can be passed as the
         text parameter.
 
         If no colors are specified, the default colors are used.
+
+        If `markup` is true, string text can change its colors inline, such
+        as in `'{red}HP{/} 10'`, see `empyro.markup`. Charcodes are written
+        as they are.
         """
         if isinstance(text, CharCode):
             text = [text]
-        if (at not in self.size or
-            at[0] + len(text) - 1 >= self.size.top_right.x):
-            raise ValueError('writing out of bound')
         fg_color = self.fg_color if fg_color is None else fg_color
         bg_color = self.bg_color if bg_color is None else bg_color
-        for pos, char in enumerate(text):
-            self.draw_glyph(
-                Glyph(char, fg_color, bg_color), Point(at[0] + pos, at[1]))
+        if markup and isinstance(text, str):
+            from . import markup as markup_
+            glyphs = markup_.glyphs(text, fg_color, bg_color)
+        else:
+            glyphs = [Glyph(char, fg_color, bg_color) for char in text]
+        if (at not in self.size or
+            at[0] + len(glyphs) - 1 >= self.size.top_right.x):
+            raise ValueError('writing out of bound')
+        self.draw_span(glyphs, at)
         return self
 
     def fill(self, bg: Color, window: Rect):
@@ -74,10 +88,9 @@ class Terminal(ABC):
         if window not in self.size:
             raise ValueError('window out of bounds')
 
-        _glyph = Glyph(CharCode.SPACE, None, bg)
-        for _y in range(window[1], window[3]):
-            for _x in range(window[0], window[2]):
-                self.draw_glyph(_glyph, Point(_x, _y))
+        _span = [Glyph(CharCode.SPACE, None, bg)] * window[2]
+        for _y in range(window[1], window[1] + window[3]):
+            self.draw_span(_span, Point(window[0], _y))
         return self
 
     def clear(self, window: Rect = None):
@@ -93,11 +106,140 @@ class Terminal(ABC):
         self.fill(self.bg_color, window)
         return self
 
-    def view(self, window: Rect):
+    def draw_hline(self, at: Point, length: int, style: int = None,
+                   fg_color: Color = None, bg_color: Color = None):
+        """Draw a horizontal line of `length` cells starting at the specified
+        position, in `box.SINGLE` (the default) or `box.DOUBLE` style.
+
+        On terminals that can read back their cells (see `glyph_at`), lines
+        drawn across other lines merge with them into junctions.
+        The line is drawn as a single span.
+
+        If no colors are specified, the default colors are used.
+        """
+        if length < 1 or Rect(at[0], at[1], length, 1) not in self.size:
+            raise ValueError('line out of bounds')
+        from . import box
+        cells = box.hline(at, length, box.SINGLE if style is None else style)
+        points = [Point(at[0] + x, at[1]) for x in range(length)]
+        self.draw_span(self._line_glyphs(cells, points, fg_color, bg_color),
+                       points[0])
+        return self
+
+    def draw_vline(self, at: Point, length: int, style: int = None,
+                   fg_color: Color = None, bg_color: Color = None):
+        """Draw a vertical line of `length` cells starting at the specified
+        position, see `draw_hline`. The line is drawn as a single column.
+        """
+        if length < 1 or Rect(at[0], at[1], 1, length) not in self.size:
+            raise ValueError('line out of bounds')
+        from . import box
+        cells = box.vline(at, length, box.SINGLE if style is None else style)
+        points = [Point(at[0], at[1] + y) for y in range(length)]
+        self.draw_column(self._line_glyphs(cells, points, fg_color, bg_color),
+                         points[0])
+        return self
+
+    def draw_box(self, window: Rect, style: int = None,
+                 fg_color: Color = None, bg_color: Color = None):
+        """Draw the border of a window, at least 2x2 cells, see `draw_hline`.
+        The top and bottom edges are drawn as spans, the left and right
+        ones as columns, leaving the inside of the window untouched.
+
+        >>> from empyro import box
+        >>> from empyro.canvas import Canvas
+        >>> canvas = Canvas((5, 3)).draw_box((0, 0, 5, 3))
+        >>> _ = canvas.draw_vline((2, 0), 3, box.DOUBLE)
+        >>> ''.join(chr(canvas.glyph_at((x, 2)).code) for x in range(5))
+        '└─╨─┘'
+        """
+        if window not in self.size:
+            raise ValueError('window out of bounds')
+        from . import box
+        cells = box.box(window, box.SINGLE if style is None else style)
+        x, y, width, height = window
+        rows = (y, y + height - 1)
+        columns = (x, x + width - 1)
+        for row in rows:
+            points = [Point(column, row) for column in range(x, x + width)]
+            self.draw_span(
+                self._line_glyphs(cells, points, fg_color, bg_color),
+                points[0])
+        if height == 2:
+            return self
+        for column in columns:
+            points = [Point(column, row) for row in range(y + 1,
+                                                          y + height - 1)]
+            self.draw_column(
+                self._line_glyphs(cells, points, fg_color, bg_color),
+                points[0])
+        return self
+
+    def _line_glyphs(self, cells: dict, points: List[Point],
+                     fg_color: Color, bg_color: Color) -> List[Glyph]:
+        # the glyphs of line cells, merged with the cells beneath if they
+        # can be read.
+        from . import box
+        fg_color = self.fg_color if fg_color is None else fg_color
+        bg_color = self.bg_color if bg_color is None else bg_color
+        glyphs = []
+        readable = True
+        for at in points:
+            arms = tuple(cells[at])
+            code = None
+            if readable:
+                try:
+                    code = box.merge(self.glyph_at(at).code, arms)
+                except NotImplementedError:
+                    readable = False
+            if code is None:
+                code = box.char_for(arms)
+            glyphs.append(Glyph(code, fg_color, bg_color))
+        return glyphs
+
+    def resize(self, size: Size):
+        """Resize the terminal, keeping the contents of the cells that are
+        still inside it. Views into the terminal are clipped to the new size,
+        and regain their size if the terminal grows back.
+        """
+        self.size = Rect(0, 0, *size)
+        for view in list(self._views):
+            view._fit(self.size)
+        return self
+
+    def scroll(self, window: Rect, dx: int, dy: int):
+        """Move the contents of a portion of the terminal by dx and dy cells.
+
+        Contents moved outside of the window are discarded, and the cells
+        uncovered by the move keep their old contents, so they should be
+        redrawn by the caller.
+
+        Terminals that don't support scrolling raise `NotImplementedError`.
+        """
+        raise NotImplementedError('terminal does not support scrolling')
+
+    def view(self, window: Rect, cached: bool = False):
         """Return a sub view into the terminal, see `Subterminal`.
+
+        If `cached` is true, the view retains its contents and is composited
+        onto the terminal as a whole, see `CachedSubterminal`.
         """
+        if cached:
+            return CachedSubterminal(self, window)
         return Subterminal(self, window)
 
+    def read_events(self) -> List['event.Event']:
+        """Return the input events pending since the last read, without
+        waiting. The events are coalesced, see `event.coalesce`, and the
+        mouse events are in cell coordinates.
+
+        Terminals that don't support it raise `NotImplementedError`, as do
+        views, which would take the events of their root and siblings: read
+        the events from the root, and filter them for a view with
+        `Subterminal.events_in`.
+        """
+        raise NotImplementedError('terminal does not support reading events')
+
     @abstractmethod
     def get_key(self) -> Key:
         """Return the pressed key.
@@ -113,6 +255,47 @@ class Terminal(ABC):
         """
         pass
 
+    def draw_span(self, glyphs: Sequence[Glyph], at: Point):
+        """Draw a horizontal run of glyphs starting at the specified
+        position, bounds are checked once for the whole run.
+
+        Terminals can override it to draw the run at once, by default the
+        glyphs are drawn one by one.
+        """
+        if not glyphs:
+            return
+        if at not in self.size or at[0] + len(glyphs) > self.size.width:
+            raise ValueError('draw out of bounds')
+        x, y = at
+        for offset, glyph_ in enumerate(glyphs):
+            self.draw_glyph(glyph_, Point(x + offset, y))
+
+    def _draw_span_unchecked(self, glyphs: Sequence[Glyph], at: Point):
+        # draw a span already known to be inside the terminal, such as the
+        # spans of a display list checked as a whole. Terminals can
+        # override it to skip the bounds checks of `draw_span`.
+        self.draw_span(glyphs, at)
+
+    def draw_column(self, glyphs: Sequence[Glyph], at: Point):
+        """Draw a vertical run of glyphs starting at the specified position,
+        see `draw_span`.
+        """
+        if not glyphs:
+            return
+        if at not in self.size or at[1] + len(glyphs) > self.size.height:
+            raise ValueError('draw out of bounds')
+        x, y = at
+        for offset, glyph_ in enumerate(glyphs):
+            self.draw_glyph(glyph_, Point(x, y + offset))
+
+    def glyph_at(self, at: Point) -> Glyph:
+        """Return the glyph at the specified position.
+
+        Terminals that can't read back their cells raise
+        `NotImplementedError`.
+        """
+        raise NotImplementedError('terminal cells can not be read')
+
 
 class Subterminal(Terminal):
     """Provide a way to treat a portion of the root terminal as a
@@ -129,31 +312,243 @@ class Subterminal(Terminal):
             raise ValueError('window out of bounds')
         super().__init__((window[2], window[3]))
         self.view_window = Rect(*window)
+        # the window as requested, before fitting it to the root.
+        self._window = self.view_window
         self._root = root
+        root._views.add(self)
 
     @property
     def root(self):
         return self._root
 
+    def resize(self, size: Size):
+        """Resize the view, keeping its position in the root terminal."""
+        window = Rect(self._window.x, self._window.y, *size)
+        if window not in self._root.size:
+            raise ValueError('window out of bounds')
+        self._window = window
+        self._fit(self._root.size)
+        return self
+
+    def _fit(self, bounds: Rect):
+        # clip the requested window to the bounds of the root.
+        x, y, width, height = self._window
+        self.view_window = Rect(x, y,
+                                max(0, min(x + width, bounds.width) - x),
+                                max(0, min(y + height, bounds.height) - y))
+        Terminal.resize(self, self.view_window.size)
+
     # override to eliminate nested subterminals
-    def view(self, window: Rect):
+    def view(self, window: Rect, cached: bool = False):
         if window not in self.size:
             raise ValueError('window out of bounds')
-        return Subterminal(self._root, window)
+        return self._root.view(window, cached)
 
     def draw_glyph(self, glyph_: Glyph, at: Point):
         point = Point(self.view_window.x + at[0],
                       self.view_window.y + at[1])
         self._root.draw_glyph(glyph_, point)
 
+    def draw_span(self, glyphs: Sequence[Glyph], at: Point):
+        if not glyphs:
+            return
+        if at not in self.size or at[0] + len(glyphs) > self.size.width:
+            raise ValueError('draw out of bounds')
+        self._root.draw_span(glyphs, Point(self.view_window.x + at[0],
+                                           self.view_window.y + at[1]))
+
+    def _draw_span_unchecked(self, glyphs: Sequence[Glyph], at: Point):
+        self._root._draw_span_unchecked(
+            glyphs, Point(self.view_window.x + at[0],
+                          self.view_window.y + at[1]))
+
+    def draw_column(self, glyphs: Sequence[Glyph], at: Point):
+        if not glyphs:
+            return
+        if at not in self.size or at[1] + len(glyphs) > self.size.height:
+            raise ValueError('draw out of bounds')
+        self._root.draw_column(glyphs, Point(self.view_window.x + at[0],
+                                             self.view_window.y + at[1]))
+
+    def glyph_at(self, at: Point) -> Glyph:
+        if at not in self.size:
+            raise ValueError('position out of bounds')
+        return self._root.glyph_at(Point(self.view_window.x + at[0],
+                                         self.view_window.y + at[1]))
+
+    def scroll(self, window: Rect, dx: int, dy: int):
+        if window not in self.size:
+            raise ValueError('window out of bounds')
+        self._root.scroll(Rect(self.view_window.x + window[0],
+                               self.view_window.y + window[1],
+                               window[2], window[3]), dx, dy)
+        return self
+
     def get_key(self):
         return self._root.get_key()
 
+    def events_in(self, events: List['event.Event']
+                  ) -> List['event.Event']:
+        """Return the events of a batch read from the root that concern the
+        view: the key presses, and the mouse events over the view, moved
+        to its coordinates. Views don't read events themselves, so the
+        root and every view can be given the same batch.
+
+        >>> from empyro import event
+        >>> from empyro.backends.memory import MemoryTerminal
+        >>> view = MemoryTerminal((10, 4)).view((2, 1, 4, 2))
+        >>> view.events_in([event.MouseClick(Point(3, 2), 1),
+        ...                 event.MouseMotion(Point(0, 0))])
+        [MouseClick(at=Point(x=1, y=1), button=1)]
+        """
+        from . import event
+        x0, y0 = self.view_window.x, self.view_window.y
+        moved = []
+        for event_ in events:
+            if isinstance(event_, event.KeyPress):
+                moved.append(event_)
+                continue
+            at = Point(event_.at[0] - x0, event_.at[1] - y0)
+            if at in self.size:
+                moved.append(event_._replace(at=at))
+        return moved
+
+
+class CachedSubterminal(Subterminal):
+    """A subterminal that retains its contents, meant for static panels
+    such as borders, frames and help screens.
+
+    Writes go to a packed snapshot of the view. Roots supporting it
+    (see `DrawMixin`) composite the snapshot as a whole when it changes
+    or when something is drawn over it, surface backends do so with a
+    single blit of a cached surface. On other roots, writes go through
+    to the root as well.
+
+    additional properties:
+        version -- incremented whenever the contents change.
+
+    Nested views write into the cached view. Views are held weakly by
+    their root, close a view to detach it before it's collected, so the
+    cells beneath it can be drawn again.
+
+    >>> from empyro.canvas import Canvas
+    >>> panel = Canvas((10, 10)).view((2, 2, 4, 4), cached=True)
+    >>> panel.write('hi', (0, 0)).glyph_at((1, 0)).code
+    <CharCode.I_LOWER: 105>
+    >>> panel.version
+    2
+    >>> from empyro.backends.memory import MemoryTerminal
+    >>> term = MemoryTerminal((4, 1))
+    >>> panel = term.view((0, 0, 4, 1), cached=True).write('HELP', (0, 0))
+    >>> _ = term.render()
+    >>> panel.close()
+    >>> len(term.write('....', (0, 0)).render())
+    4
+    """
+
+    def __init__(self, root: Terminal, window: Rect):
+        super().__init__(root, window)
+        self._snapshot = array('Q', [glyph.PACKED_CLEAR]) * (
+            self.size.width * self.size.height)
+        self.version = 0
+        # whether the view has to be composited onto the root.
+        self._damaged = True
+        glyph.track(self)
+        attach = getattr(root, '_attach_cached_view', None)
+        self._attached = attach is not None
+        if self._attached:
+            attach(self)
+
+    def view(self, window: Rect, cached: bool = False):
+        if window not in self.size:
+            raise ValueError('window out of bounds')
+        return Subterminal(self, window)
+
+    def _packed_arrays(self):
+        return (self._snapshot,)
+
+    def _fit(self, bounds: Rect):
+        old_width, old_height = self.size.width, self.size.height
+        old_snapshot = self._snapshot
+        super()._fit(bounds)
+        width, height = self.size.width, self.size.height
+        if (width, height) == (old_width, old_height):
+            return
+        self._snapshot = array('Q', [glyph.PACKED_CLEAR]) * (width * height)
+        kept = min(width, old_width)
+        for y in range(min(height, old_height)):
+            self._snapshot[y * width:y * width + kept] = \
+                old_snapshot[y * old_width:y * old_width + kept]
+        self.invalidate()
+
+    def draw_glyph(self, glyph_: Glyph, at: Point):
+        if at not in self.size:
+            raise ValueError('draw out of bounds')
+        index = at[1] * self.size.width + at[0]
+        value = glyph.pack(glyph_)
+        if self._snapshot[index] != value:
+            self._snapshot[index] = value
+            self.version += 1
+            self._damaged = True
+        if not self._attached:
+            super().draw_glyph(glyph_, at)
+
+    # draw spans through `draw_glyph`, not directly to the root
+    draw_span = Terminal.draw_span
+    _draw_span_unchecked = Terminal._draw_span_unchecked
+    draw_column = Terminal.draw_column
+
+    def glyph_at(self, at: Point) -> Glyph:
+        """Return the glyph at the specified position."""
+        if at not in self.size:
+            raise ValueError('position out of bounds')
+        return glyph.unpack(self._snapshot[at[1] * self.size.width + at[0]])
+
+    def cells(self):
+        """Generator of the view's cells, yield a tuple of the position
+        relative to the root and the glyph.
+        """
+        x0, y0, width, _ = self.view_window
+        unpack = glyph.unpack
+        for index, value in enumerate(self._snapshot):
+            y, x = divmod(index, width)
+            yield Point(x0 + x, y0 + y), unpack(value)
+
+    def close(self):
+        """Detach the view from its root, the cells beneath it keep its
+        contents until drawn over. The view shouldn't be drawn to after.
+        """
+        if self._attached:
+            self._root._detach_cached_view(self)
+            self._attached = False
+        self._root._views.discard(self)
+
+    def invalidate(self):
+        """Re-raster the view and composite it onto the root."""
+        self.version += 1
+        self._damaged = True
+        if not self._attached:
+            for at, glyph_ in self.cells():
+                self._root.draw_glyph(glyph_, at)
+        return self
+
 
 class RenderableTerminal(Terminal, ABC):
     """A renderable terminal is a terminal that guarantees the results of
     writes are fully written after the `render` method is called.
     """
+    @property
+    def animator(self):
+        """The `animation.Animator` of the terminal, created when first
+        used. Tick it before rendering to draw the animations.
+        """
+        try:
+            return self._animator
+        except AttributeError:
+            from .animation import Animator
+            self._animator = Animator(self)
+            return self._animator
+
     @abstractmethod
     def render(self):
         """Render the terminal displaying all writes to the screen.
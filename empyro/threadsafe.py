@@ -0,0 +1,176 @@
+"""Provide a thread safe front end for drawing to a terminal from many
+threads, while a single thread renders it.
+
+Draws made through the front end are queued as spans into a buffer owned
+by the drawing thread, so producers never wait for each other nor for the
+rendering. The render thread drains the buffers into the terminal when
+rendering.
+
+defines the following:
+    QueuedTerminal -- a thread safe front end to a renderable terminal.
+"""
+
+import threading
+from collections import deque
+from contextlib import contextmanager
+from itertools import count
+from operator import itemgetter
+from typing import Sequence
+
+from .glyph import Glyph
+from .terminal import RenderableTerminal
+from .coord import Point, Size
+
+
+class QueuedTerminal(RenderableTerminal):
+    """A thread safe front end to a renderable terminal.
+    Implements `RenderableTerminal` ABC.
+
+    Any thread can draw to the front end. Draws are queued, and applied
+    to the terminal by `render`, which must be called from a single thread,
+    the one rendering the terminal.
+
+    properties:
+        terminal -- the terminal drawn to.
+        ordered  -- if true, the queued batches are applied in the order
+                    they were submitted across all threads. otherwise,
+                    they are applied in order per thread.
+
+    Use `batch` to have several draws applied together.
+
+    >>> from empyro.displaylist import DisplayList
+    >>> class Term(DisplayList, RenderableTerminal):
+    ...     def render(self): pass
+    >>> term = Term((20, 2))
+    >>> front = QueuedTerminal(term, ordered=True)
+    >>> worker = threading.Thread(target=front.write, args=('busy', (0, 1)))
+    >>> worker.start(); worker.join()
+    >>> with front.batch():
+    ...     _ = front.write('hp', (0, 0)).write('10', (3, 0))
+    >>> len(term)
+    0
+    >>> front.render()
+    >>> len(term)
+    3
+    """
+
+    def __init__(self, terminal: RenderableTerminal, ordered: bool = False):
+        super().__init__(terminal.size.size)
+        self.terminal = terminal
+        self.ordered = ordered
+        self._local = threading.local()
+        # list of (thread, buffer of (sequence number, batch))
+        self._buffers = []
+        self._buffers_lock = threading.Lock()
+        self._sequence = count()
+
+    def _buffer(self) -> deque:
+        # the buffer of the current thread.
+        try:
+            return self._local.buffer
+        except AttributeError:
+            pass
+        buffer = self._local.buffer = deque()
+        with self._buffers_lock:
+            self._buffers.append((threading.current_thread(), buffer))
+        return buffer
+
+    def _submit(self, command: tuple):
+        pending = getattr(self._local, 'batch', None)
+        if pending is not None:
+            pending.append(command)
+        else:
+            self._buffer().append((next(self._sequence), [command]))
+
+    @contextmanager
+    def batch(self):
+        """Group the draws made by the current thread inside the `with`
+        block, the group is applied at once. If the block raises, the
+        draws are discarded.
+        """
+        if getattr(self._local, 'batch', None) is not None:
+            # nested, part of the outer batch
+            yield self
+            return
+        self._local.batch = []
+        try:
+            yield self
+        except BaseException:
+            self._local.batch = None
+            raise
+        commands, self._local.batch = self._local.batch, None
+        if commands:
+            self._buffer().append((next(self._sequence), commands))
+
+    def draw_glyph(self, glyph_: Glyph, at: Point):
+        if at not in self.size:
+            raise ValueError('draw out of bounds')
+        self._submit((at[0], at[1], (glyph_,)))
+
+    def draw_span(self, glyphs: Sequence[Glyph], at: Point):
+        if not glyphs:
+            return
+        if at not in self.size or at[0] + len(glyphs) > self.size.width:
+            raise ValueError('draw out of bounds')
+        self._submit((at[0], at[1], tuple(glyphs)))
+
+    def draw_column(self, glyphs: Sequence[Glyph], at: Point):
+        # queued as a batch of single glyph spans, applied at once
+        with self.batch():
+            super().draw_column(glyphs, at)
+
+    def drain(self):
+        """Apply the queued draws to the terminal.
+        Batches submitted while draining may be left for the next drain.
+
+        Draws checked against the size before a resize, by producers
+        racing it or by batches open across it, are clipped to the size
+        of the terminal.
+
+        >>> from empyro.displaylist import DisplayList
+        >>> front = QueuedTerminal(DisplayList((20, 2)))
+        >>> with front.batch():
+        ...     _ = front.write('health', (10, 0))
+        ...     _ = front.resize((12, 2))
+        >>> front.drain().terminal._spans[0][:2]
+        (10, 0)
+        >>> len(front.terminal._spans[0][2])
+        2
+        """
+        with self._buffers_lock:
+            buffers = list(self._buffers)
+        batches = []
+        for thread, buffer in buffers:
+            # only take what was there, so busy producers can't stall us
+            for _ in range(len(buffer)):
+                batches.append(buffer.popleft())
+            if not buffer and not thread.is_alive():
+                with self._buffers_lock:
+                    self._buffers.remove((thread, buffer))
+        if self.ordered:
+            batches.sort(key=itemgetter(0))
+        draw_span = self.terminal.draw_span
+        width, height = self.terminal.size.width, self.terminal.size.height
+        for _, commands in batches:
+            for x, y, glyphs in commands:
+                if x >= width or y >= height:
+                    continue
+                if x + len(glyphs) > width:
+                    glyphs = glyphs[:width - x]
+                draw_span(glyphs, Point(x, y))
+        return self
+
+    def resize(self, size: Size):
+        """Resize the terminal, must be called from the render thread.
+        The queued draws are applied before resizing.
+        """
+        self.drain()
+        self.terminal.resize(size)
+        return super().resize(size)
+
+    def render(self):
+        self.drain()
+        return self.terminal.render()
+
+    def get_key(self):
+        return self.terminal.get_key()
@@ -12,13 +12,15 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="https://github.com/aymanizz/empyro",
     packages=setuptools.find_packages(),
-    python_requires='>=3.4',
+    python_requires='>=3.7',
     classifiers=[
         "Intended Audience :: Developers",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.4",
-        "Programming Language :: Python :: 3.5",
-        "Programming Language :: Python :: 3.6",
+        "Programming Language :: Python :: 3.7",
+        "Programming Language :: Python :: 3.8",
+        "Programming Language :: Python :: 3.9",
+        "Programming Language :: Python :: 3.10",
+        "Programming Language :: Python :: 3.11",
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
         "Topic :: Terminals",